@@ -1,16 +1,21 @@
 from Core.basicModel import BasicModel
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+from Agent.baseExcuter import BaseExcuter
+from Agent.funcScheduler import FuncScheduler
+from Utils.Messages.contextBuilder import ContextBuilder
 from Utils.config import Config
-import re
-import ast
-import json
-from Utils.Messages.messageStorage.messageToSqlite import MemorySystem, Message
+from Utils.toolIndex import ToolIndex
+from Tools.funcSchema import schema_from_info
 
 
-class AgentExcuter:
+class AgentExcuter(BaseExcuter):
     """
     智能体执行器,使用本地工具
     """
-    def __init__(self, model: BasicModel, func_doc, func_object,iter_num=10, message_store: MemorySystem = None):
+    def __init__(self, model: BasicModel, func_doc, func_object,iter_num=10, message_store: MemorySystem = None,
+                 scheduler: FuncScheduler = None, stream: bool = False, context_builder: ContextBuilder = None,
+                 top_k: int = None, tool_index: ToolIndex = None,
+                 native_tools: bool = None, func_schema: dict = None):
         """
         初始化智能体
         :param model: 使用的模型
@@ -18,160 +23,44 @@ class AgentExcuter:
         :param func_object: 函数对象
         :param iter_num: 工具中间调用失败时，最大迭代次数
         :param message_store: 消息持久化存储配置
+        :param scheduler: 函数调度器，同一回复中相互独立的函数调用并行执行
+        :param stream: 是否流式调用模型，<functools> 标签闭合后立即结束生成并执行函数
+        :param context_builder: 对话历史构建器，默认按 Config.context_max_tokens 的 token 预算组织历史，
+                                按 Config.context_recall_k 召回相关的早期消息
+        :param top_k: 每次提问只放入最相关的 top_k 个函数，默认使用 Config.tool_top_k
+        :param tool_index: 函数信息检索索引
+        :param native_tools: 是否使用模型的原生函数调用，默认使用 Config.native_tools；开启后不再发送用例文本，
+                             函数调用从模型回复的结构化字段中读取，stream 不生效
+        :param func_schema: 函数名称到 JSON 工具描述的映射，默认使用注册时生成的描述
         """
-        self.model = model
         self.func_doc = func_doc
         self.func_object = func_object
-        self.iter_num = iter_num
-        self.message_store = message_store
-
-    def run(self, inputs):
+        if func_schema is None:
+            func_schema = {name: Config.register_funSchema.get(name) or schema_from_info(name, info)
+                           for name, info in func_doc.items()}
+        if tool_index is None and func_doc is Config.register_funDoc:
+            # 使用全局注册表时复用注册时维护的索引
+            tool_index = Config.tool_index
+        super().__init__(model, func_doc, func_schema, iter_num, message_store, scheduler, stream,
+                         context_builder, top_k, tool_index, native_tools)
+
+    def _callFunc(self, func_name: str, params: dict):
         """
-        模型调用
-        :param inputs:
+        执行单个工具函数
+        :param func_name: 函数名称
+        :param params: 函数参数
         :return:
         """
-        return self.model.invoke(messages=inputs)
+        return self.func_object[func_name](**params)
 
-    def _prompt(self, inputs, func_results:list = []):
+    def _unknownFuncs(self, func_tools: list) -> list:
         """
-        根据模型的输入、函数信息、函数执行结果，组织新的模型输入
-        :param inputs:
+        本批次中没有对应函数对象的函数名称
+        :param func_tools: 函数调用列表
         :return:
         """
-
-        # 函数介绍
-        func_info = ""
-        for v in self.func_doc.values():
-            func_info += v + "。"
-
-        new_inputs = (Config.default_prompt +
-                      Config.few_shot +
-                      f"\n函数信息：{func_info}" +
-                      f"\n用户输入：{inputs}")
-        if len(func_results) > 0:
-            new_inputs += f"\n已执行的函数结果为：{';'.join(func_results)}"
-
-        return new_inputs
-
-    def _getFuncTools(self, inputs):
-        parse = re.compile(r"<functools>(.*?)</functools>", flags=re.S)
-        try:
-            m = parse.findall(inputs)  # 只取第一处
-            if not m:
-                return True, []  # 无标签就返回空列表
-
-            json_str = m[0]
-
-            if json_str == "":
-                return True, []
-
-            try:
-                obj = json.loads(json_str)  # JSON 解析，支持 null/true/false
-            except json.JSONDecodeError as e:
-                print(f'❌ JSON 解析失败：{e}')
-                return False, []
-
-            # 统一成 list
-            if isinstance(obj, dict):
-                obj = [obj]
-            if not isinstance(obj, list):
-                print('❌ <functools> 内容必须是 dict 或 list[dict]')
-                return False, []
-
-            return True, obj
-        except Exception as e:
-            print(f"出现错误❌：{str(e)}")
-            return False, []
-
-    def __call__(self, session_id: str, inputs: str):
-        """
-        智能体执行入口
-        :param session_id: 用户对话唯一标识
-        :param inputs: 用户输入
-        :return:
-        """
-        count = 0
-        try:
-            response = ""
-            func_results = []
-            while True:
-                count += 1
-
-                if count > self.iter_num:
-                    print(f"达到最大迭代次数 {count} 次")
-                    break
-
-                inputs = self._prompt(inputs, func_results)
-
-                # 消息存储
-                user_message = Message(role="user", content=inputs)
-                self.message_store.store_message(session_id, user_message)
-
-                # 获取对话上下文
-                context = self.message_store.get_recent_context(session_id, limit=5)
-
-                # 构建提示
-                context_str = "\n".join([
-                    f"{msg.role}: {msg.content}"
-                    for msg in context[:-1]  # 排除当前消息
-                ])
-
-                full_inputs = f"""
-                对话历史：
-                {context_str}
-                用户：{inputs}
-                助手："""
-
-                # 执行 大模型
-                response = self.run(full_inputs)
-
-                print(f"\n\n===================== 第 {count} 轮 结果=======================")
-                print(f"模型回复为：{response}")
-
-                status, func_tools = self._getFuncTools(response)
-
-                if not status:
-                    print(f"本次模型回复格式不规范...")
-                    continue
-
-                if len(func_tools) < 1:
-                    print(f"函数调用结束 或 没有可调用函数")
-                    break
-
-                first_func_name = func_tools[0].get("func", "unknow")
-                first_func_param = func_tools[0].get("params", {})
-
-                if first_func_name == "unknow":
-                    print(f"未发现对应函数名称")
-                    break
-                first_func = self.func_object.get(first_func_name, "unknow")
-
-                if first_func == "unknow":
-                    print(f"未发现对应函数")
-                    break
-
-                first_func_result = first_func(**first_func_param)
-                func_results.append(f"函数 {first_func_name} 的运行结果为 {first_func_result}")
-
-                print(f"函数 {first_func_name} 的运行结果为 {first_func_result}")
-
-                # 存储工具调用和结果
-                tool_message = Message(
-                    role="assistant",
-                    content=response,
-                    metadata={"tool": first_func_name, "args": first_func_param}
-                )
-                self.message_store.store_message(session_id, tool_message)
-
-                result_message = Message(
-                    role="tool",
-                    content=f"函数 {first_func_name} 调用结果为: {first_func_result}",
-                    metadata={"tool": first_func_name, "args": first_func_param, "tool_result": True}
-                )
-                self.message_store.store_message(session_id, result_message)
-
-            return response
-        except Exception as e:
-            print(f"出现错误❌：{str(e)}")
-            return f"出现错误❌：{str(e)}"
\ No newline at end of file
+        unknown = [f.get("func", "unknow") for f in func_tools
+                   if self.func_object.get(f.get("func", "unknow"), "unknow") == "unknow"]
+        if unknown:
+            print(f"未发现对应函数 {unknown}")
+        return unknown
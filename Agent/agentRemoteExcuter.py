@@ -1,18 +1,24 @@
 from Core.basicModel import BasicModel
-from Utils.config import Config
-import re
-import ast
-import json
 import requests
-from Utils.Messages.messageStorage.messageToSqlite import MemorySystem, Message
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+from Agent.baseExcuter import BaseExcuter
+from Agent.funcScheduler import FuncScheduler
+from Utils.Messages.contextBuilder import ContextBuilder
+from Utils.toolIndex import ToolIndex
+from Tools.funcSchema import schema_from_info
+from Utils.httpSession import get_session
 
 
-class AgentRemoteExcuter:
+class AgentRemoteExcuter(BaseExcuter):
     """
     智能体执行器,使用服务端工具
     """
 
-    def __init__(self, model: BasicModel, func_doc, url, iter_num=10, message_store: MemorySystem = None):
+    def __init__(self, model: BasicModel, func_doc, url, iter_num=10, message_store: MemorySystem = None,
+                 scheduler: FuncScheduler = None, stream: bool = False, context_builder: ContextBuilder = None,
+                 top_k: int = None, tool_index: ToolIndex = None,
+                 native_tools: bool = None, func_schema: dict = None,
+                 batch_url: str = None, session: requests.Session = None):
         """
         初始化智能体
         :param model: 使用的模型
@@ -20,153 +26,69 @@ class AgentRemoteExcuter:
         :param url: 远程函数服务注册调用中心
         :param iter_num: 工具中间调用失败时，最大迭代次数
         :param message_store: 消息持久化存储配置
+        :param scheduler: 函数调度器，同一回复中相互独立的函数调用并行执行
+        :param stream: 是否流式调用模型，<functools> 标签闭合后立即结束生成并执行函数
+        :param context_builder: 对话历史构建器，默认按 Config.context_max_tokens 的 token 预算组织历史，
+                                按 Config.context_recall_k 召回相关的早期消息
+        :param top_k: 每次提问只放入最相关的 top_k 个函数，默认使用 Config.tool_top_k
+        :param tool_index: 函数信息检索索引
+        :param native_tools: 是否使用模型的原生函数调用，默认使用 Config.native_tools；开启后不再发送用例文本，
+                             函数调用从模型回复的结构化字段中读取，stream 不生效
+        :param func_schema: 函数名称到 JSON 工具描述的映射，默认使用 func_doc 中服务端返回的描述
+        :param batch_url: 远程批量调用接口，默认由 url 的 /call 替换为 /batch 得到
+        :param session: HTTP 会话，默认使用进程内共享的连接池
         """
-        self.model = model
         self.func_doc = func_doc
         self.url = url
-        self.iter_num = iter_num
-        self.message_store = message_store or MemorySystem()
-
-    def run(self, inputs):
+        func_infos = {item.get("func_name"): item.get("func_info") for item in self.func_doc}
+        if func_schema is None:
+            # 服务端返回的工具描述，旧版服务没有时根据函数信息生成
+            func_schema = {}
+            for item in self.func_doc:
+                name = item.get("func_name")
+                func_schema[name] = item.get("func_schema") or schema_from_info(name, item.get("func_info"))
+        super().__init__(model, func_infos, func_schema, iter_num, message_store or MemorySystem(), scheduler,
+                         stream, context_builder, top_k, tool_index, native_tools)
+        if batch_url is None and url.endswith("/call"):
+            batch_url = url[:-len("/call")] + "/batch"
+        self.batch_url = batch_url
+        self.session = session or get_session()
+
+    def _callFunc(self, func_name: str, params: dict):
         """
-        模型调用
-        :param inputs:
+        调用远程工具函数
+        :param func_name: 函数名称
+        :param params: 函数参数
         :return:
         """
-        return self.model.invoke(messages=inputs)
+        remote_url_response = self.session.post(url=self.url, json={"func": func_name, "params": params})
+        remote_url_response.raise_for_status()  # 不是 2xx 会报异常
+
+        return remote_url_response.json()['result']
 
-    def _prompt(self, inputs, func_results: list = []):
+    def _callBatch(self, func_tools: list) -> list:
         """
-        根据模型的输入、函数信息、函数执行结果，组织新的模型输入
-        :param inputs:
-        :return:
+        一次请求调用多个远程工具函数，由服务端并发执行
+        :param func_tools: 函数调用列表
+        :return: 与调用顺序一致的结果列表
         """
-
-        # 函数介绍
-        func_info = ""
-        for item in self.func_doc:
-            v = item.get("func_info")
-            func_info += v + "。"
-
-        new_inputs = (Config.default_prompt +
-                      Config.few_shot +
-                      f"\n函数信息：{func_info}" +
-                      f"\n用户输入：{inputs}")
-        if len(func_results) > 0:
-            new_inputs += f"\n已执行的函数结果为：{';'.join(func_results)}"
-
-        return new_inputs
-
-    def _getFuncTools(self, inputs):
-        parse = re.compile(r"<functools>(.*?)</functools>", flags=re.S)
-        try:
-            m = parse.findall(inputs)  # 只取第一处
-            if not m:
-                return True, []  # 无标签就返回空列表
-
-            json_str = m[0]
-
-            if json_str == "":
-                return True, []
-
-            try:
-                obj = json.loads(json_str)  # JSON 解析，支持 null/true/false
-            except json.JSONDecodeError as e:
-                print(f'❌ JSON 解析失败：{e}')
-                return False, []
-
-            # 统一成 list
-            if isinstance(obj, dict):
-                obj = [obj]
-            if not isinstance(obj, list):
-                print('❌ <functools> 内容必须是 dict 或 list[dict]')
-                return False, []
-
-            return True, obj
-        except Exception as e:
-            print(f"出现错误❌：{str(e)}")
-            return False, []
-
-    def __call__(self, session_id: str, inputs: str):
+        items = [{"func": f.get("func"), "params": f.get("params", {}) or {}} for f in func_tools]
+        remote_url_response = self.session.post(url=self.batch_url, json={"items": items})
+        remote_url_response.raise_for_status()
+
+        results = []
+        for func_tool, item in zip(func_tools, remote_url_response.json()['results']):
+            if "error" in item:
+                raise RuntimeError(f"函数 {func_tool.get('func')} 调用失败: {item['error']}")
+            results.append(item['result'])
+        return results
+
+    def _callTools(self, func_tools: list) -> list:
         """
-        智能体执行入口
-        :param session_id: 用户对话唯一标识
-        :param inputs: 用户输入
-        :return:
+        多个函数调用通过批量接口一次请求完成，否则逐个调用
+        :param func_tools: 相互独立的函数调用列表
+        :return: 与调用顺序一致的结果列表
         """
-        count = 0
-        try:
-            response = ""
-            func_results = []
-            while True:
-                count += 1
-
-                if count > self.iter_num:
-                    print(f"达到最大迭代次数 {count} 次")
-                    break
-
-                inputs = self._prompt(inputs, func_results)
-
-                # 消息存储
-                user_message = Message(role="user", content=inputs)
-                self.message_store.store_message(session_id, user_message)
-
-                # 获取对话上下文
-                context = self.message_store.get_recent_context(session_id, limit=5)
-
-                # 构建提示
-                context_str = "\n".join([
-                    f"{msg.role}: {msg.content}"
-                    for msg in context[:-1]  # 排除当前消息
-                ])
-
-                full_inputs = f"""
-                对话历史：
-                {context_str}
-                用户：{inputs}
-                助手："""
-
-                # 执行 大模型
-                response = self.run(full_inputs)
-                print(f"\n\n===================== 第 {count} 轮 结果=======================")
-                print(f"模型回复为：{response}")
-
-                status, func_tools = self._getFuncTools(response)
-
-                if not status:
-                    print(f"本次模型回复格式不规范...")
-                    continue
-
-                if len(func_tools) < 1:
-                    print(f"函数调用结束 或 没有可调用函数")
-                    break
-
-                first_func_name = func_tools[0].get("func")
-                remote_url_response = requests.post(url=self.url, json=func_tools[0])
-                remote_url_response.raise_for_status()  # 不是 2xx 会报异常
-
-                response_json = remote_url_response.json()
-
-                func_results.append(f"函数 {first_func_name} 的运行结果为 {response_json['result']}")
-
-                print(f"函数 {first_func_name} 的运行结果为 {response_json['result']}")
-
-                # 存储工具调用和结果
-                tool_message = Message(
-                    role="assistant",
-                    content=response,
-                    metadata={"tool": first_func_name, "args": func_tools[0].get("params", {})}
-                )
-                self.message_store.store_message(session_id, tool_message)
-
-                result_message = Message(
-                    role="tool",
-                    content=f"函数 {first_func_name} 调用结果为: {response_json['result']}",
-                    metadata={"tool": first_func_name, "args": func_tools[0].get("params", {}), "tool_result": True}
-                )
-                self.message_store.store_message(session_id, result_message)
-
-            return response
-        except Exception as e:
-            print(f"出现错误❌：{str(e)}")
-            return f"出现错误❌：{str(e)}"
\ No newline at end of file
+        if len(func_tools) > 1 and self.batch_url:
+            return self._callBatch(func_tools)
+        return super()._callTools(func_tools)
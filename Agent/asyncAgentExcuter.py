@@ -0,0 +1,151 @@
+from Agent.agentExcuter import AgentExcuter
+from Agent.streamParser import FuncToolsStreamParser
+import asyncio
+import inspect
+from Utils.Messages.messageStorage.messageToSqlite import Message
+from Utils.metrics import metrics
+
+
+class AsyncAgentExcuter(AgentExcuter):
+    """
+    异步智能体执行器,使用本地工具
+    模型调用使用 ainvoke，同步的存储与工具调用放到线程中执行，单个进程可同时服务大量会话
+    """
+
+    async def run(self, inputs, cache: bool = True):
+        """
+        模型调用
+        :param inputs:
+        :param cache: 为 False 时不使用缓存的回复，上一次回复格式错误后重试时使用
+        :return:
+        """
+        if not self.stream:
+            return await self.model.ainvoke(messages=inputs, **self._cacheOption(cache))
+
+        parser = FuncToolsStreamParser()
+        chunks = self.model.astream_invoke(messages=inputs, **self._cacheOption(cache))
+        try:
+            async for chunk in chunks:
+                if parser.feed(chunk):
+                    break  # 标签已闭合，不再接收剩余输出
+        finally:
+            await chunks.aclose()
+
+        return parser.text
+
+    async def run_tools(self, inputs, tools: list, cache: bool = True):
+        """
+        原生函数调用
+        :param inputs: 模型输入
+        :param tools: 工具描述列表
+        :param cache: 为 False 时不使用缓存的回复
+        :return: (回复文本, 函数调用列表)，函数参数无法解析时函数调用列表为 None
+        """
+        result = await self.model.ainvoke_tools(messages=inputs, tools=tools, **self._cacheOption(cache))
+        return result["content"], result["func_tools"] if result.get("status", True) else None
+
+    async def _invoke(self, inputs, tools: list = None, cache: bool = True):
+        """
+        按调用方式执行一次模型调用
+        :param cache: 为 False 时不使用缓存的回复
+        :return: (回复文本, 原生函数调用列表，文本模式下为 None)
+        """
+        if self.native_tools:
+            return await self.run_tools(inputs, tools, cache)
+        return await self.run(inputs, cache), None
+
+    async def _callFunc(self, func_name: str, params: dict):
+        """
+        执行工具函数，async def 函数直接 await，普通函数放到线程中执行
+        :param func_name: 函数名称
+        :param params: 函数参数
+        :return:
+        """
+        func = self.func_object[func_name]
+        if inspect.iscoroutinefunction(func):
+            return await func(**params)
+        return await asyncio.to_thread(func, **params)
+
+    async def _callTools(self, func_tools: list) -> list:
+        """
+        并发执行本批次的函数调用
+        :param func_tools: 相互独立的函数调用列表
+        :return: 与调用顺序一致的结果列表
+        """
+        return await self.scheduler.arun(func_tools, self._callFunc)
+
+    async def __call__(self, session_id: str, inputs: str):
+        """
+        智能体执行入口
+        :param session_id: 用户对话唯一标识
+        :param inputs: 用户输入
+        :return:
+        """
+        count = 0
+        executor = type(self).__name__
+        try:
+            response = ""
+            func_results = []
+
+            # 对话上下文在本次对话中只读取一次
+            with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                context_str = await asyncio.to_thread(self._begin, session_id, inputs)
+
+            # 只把与本次提问相关的函数放入提示词
+            func_names = self._selectFuncs(inputs)
+            tools = self._tools(func_names) if self.native_tools else None
+            cache = True
+            # 依赖上一批结果、尚未执行的函数调用，放入下一轮提示词
+            pending_tools = []
+
+            while True:
+                count += 1
+
+                if count > self.iter_num:
+                    print(f"达到最大迭代次数 {count} 次")
+                    break
+
+                metrics.inc("agent_iterations_total", executor=executor)
+
+                full_inputs = self._buildPrompt(inputs, func_results, context_str, func_names, pending_tools)
+
+                # 执行 大模型
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="invoke"):
+                    response, func_tools = await self._invoke(full_inputs, tools, cache)
+
+                status, func_tools = self._checkResponse(count, response, func_tools)
+                # 格式错误的回复可能来自缓存，重试时跳过缓存重新调用模型
+                cache = status
+                if not status:
+                    continue
+
+                if len(func_tools) < 1:
+                    print(f"函数调用结束 或 没有可调用函数")
+                    with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                        await asyncio.to_thread(self.message_store.store_message, session_id,
+                                                Message(role="assistant", content=response))
+                    break
+
+                # 拆分出本批次可并发执行的函数调用，依赖其他函数结果的调用放入下一轮提示词
+                ready_tools, deferred_tools = self.scheduler.split(func_tools)
+
+                if self._unknownFuncs(ready_tools):
+                    break
+
+                metrics.observe("agent_tool_calls", len(ready_tools), executor=executor)
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="tools"):
+                    batch_results = await self._callTools(ready_tools)
+
+                # 本轮的工具调用与全部结果在一个事务中写入
+                turn_messages = self._turnMessages(response, ready_tools, batch_results, func_results)
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                    await asyncio.to_thread(self.message_store.store_messages, session_id, turn_messages)
+
+                pending_tools = deferred_tools
+                if deferred_tools:
+                    print(f"函数 {[f.get('func') for f in deferred_tools]} 依赖本批次结果，本轮未执行，已放入下一轮提示词")
+
+            return response
+        except Exception as e:
+            print(f"出现错误❌：{str(e)}")
+            return f"出现错误❌：{str(e)}"
@@ -0,0 +1,315 @@
+from Core.basicModel import BasicModel
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem, Message
+from Agent.funcScheduler import FuncScheduler
+from Agent.funcParser import parse_functools
+from Agent.streamParser import FuncToolsStreamParser
+from Agent.promptBuilder import PromptBuilder
+from Utils.metrics import metrics
+from Utils.Messages.contextBuilder import ContextBuilder
+from Utils.config import Config
+from Utils.toolIndex import ToolIndex
+from typing import List
+
+
+class BaseExcuter:
+    """
+    智能体执行器公共部分：提示词构建、模型调用、回复解析与每轮消息的组织
+    子类只需要提供 _callFunc(以及需要时的 _callTools、_unknownFuncs)，同步与异步执行器共用每一轮的各个步骤
+    """
+
+    def __init__(self, model: BasicModel, func_infos: dict, func_schema: dict, iter_num=10,
+                 message_store: MemorySystem = None, scheduler: FuncScheduler = None, stream: bool = False,
+                 context_builder: ContextBuilder = None, top_k: int = None, tool_index: ToolIndex = None,
+                 native_tools: bool = None):
+        """
+        :param model: 使用的模型
+        :param func_infos: 函数名称到函数信息的映射
+        :param func_schema: 函数名称到 JSON 工具描述的映射
+        :param iter_num: 工具中间调用失败时，最大迭代次数
+        :param message_store: 消息持久化存储配置
+        :param scheduler: 函数调度器，同一回复中相互独立的函数调用并行执行
+        :param stream: 是否流式调用模型，<functools> 标签闭合后立即结束生成并执行函数
+        :param context_builder: 对话历史构建器
+        :param top_k: 每次提问只放入最相关的 top_k 个函数，默认使用 Config.tool_top_k
+        :param tool_index: 函数信息检索索引，默认根据 func_infos 建立
+        :param native_tools: 是否使用模型的原生函数调用，默认使用 Config.native_tools
+        """
+        self.model = model
+        self.func_infos = func_infos
+        self.func_schema = func_schema
+        self.iter_num = iter_num
+        self.message_store = message_store
+        self.scheduler = scheduler or FuncScheduler()
+        self.stream = stream
+        self.context_builder = context_builder or ContextBuilder(self.message_store)
+        self.native_tools = Config.native_tools if native_tools is None else native_tools
+        self.prompt_builder = PromptBuilder(self.func_infos.values(), native=self.native_tools)
+        self.top_k = Config.tool_top_k if top_k is None else top_k
+        self.tool_index = tool_index or (ToolIndex.fromDocs(self.func_infos) if self.top_k else None)
+
+    @staticmethod
+    def _cacheOption(cache: bool) -> dict:
+        """跳过缓存时传给模型的参数，CacheModel 以外的模型会忽略该参数"""
+        return {} if cache else {"cache": False}
+
+    def run(self, inputs, cache: bool = True):
+        """
+        模型调用
+        :param inputs:
+        :param cache: 为 False 时不使用缓存的回复，上一次回复格式错误后重试时使用
+        :return:
+        """
+        if not self.stream:
+            return self.model.invoke(messages=inputs, **self._cacheOption(cache))
+
+        parser = FuncToolsStreamParser()
+        chunks = self.model.stream_invoke(messages=inputs, **self._cacheOption(cache))
+        try:
+            for chunk in chunks:
+                if parser.feed(chunk):
+                    break  # 标签已闭合，不再接收剩余输出
+        finally:
+            chunks.close()
+
+        return parser.text
+
+    def run_tools(self, inputs, tools: list, cache: bool = True):
+        """
+        原生函数调用
+        :param inputs: 模型输入
+        :param tools: 工具描述列表
+        :param cache: 为 False 时不使用缓存的回复
+        :return: (回复文本, 函数调用列表)，函数参数无法解析时函数调用列表为 None
+        """
+        result = self.model.invoke_tools(messages=inputs, tools=tools, **self._cacheOption(cache))
+        return result["content"], result["func_tools"] if result.get("status", True) else None
+
+    def _invoke(self, inputs, tools: list = None, cache: bool = True):
+        """
+        按调用方式执行一次模型调用
+        :param cache: 为 False 时不使用缓存的回复
+        :return: (回复文本, 原生函数调用列表，文本模式下为 None)
+        """
+        if self.native_tools:
+            return self.run_tools(inputs, tools, cache)
+        return self.run(inputs, cache), None
+
+    def _prompt(self, inputs, func_results: list = [], history: str = "", func_names: list = None,
+                pending: list = None):
+        """
+        根据原始用户输入、对话历史、函数执行结果，组织新的模型输入
+        :param inputs: 原始用户输入
+        :param func_results: 已执行的函数结果
+        :param history: 对话历史
+        :param func_names: 本次使用的函数名称，为 None 时使用全部函数
+        :param pending: 依赖上一批结果、尚未执行的函数调用
+        :return:
+        """
+        func_infos = None if func_names is None else [self.func_infos[name] for name in func_names]
+        return self.prompt_builder.build(inputs, func_results, history, func_infos, pending)
+
+    def _selectFuncs(self, inputs: str):
+        """
+        检索与用户输入最相关的 top_k 个函数
+        :param inputs: 原始用户输入
+        :return: 函数名称列表，命中不足 top_k 个时按注册顺序补足；未开启或函数数量不超过 top_k 时返回 None 表示使用全部函数
+        """
+        if not self.top_k or len(self.func_infos) <= self.top_k:
+            return None
+        names = [name for name in self.tool_index.search(inputs, self.top_k, fill=True) if name in self.func_infos]
+        if len(names) < self.top_k:
+            names += [name for name in self.func_infos if name not in names][:self.top_k - len(names)]
+        return names
+
+    def _tools(self, func_names: list = None) -> list:
+        """
+        本次传给模型的工具描述
+        :param func_names: 本次使用的函数名称，为 None 时使用全部函数
+        :return:
+        """
+        names = self.func_schema if func_names is None else func_names
+        return [self.func_schema[name] for name in names if name in self.func_schema]
+
+    def _callFunc(self, func_name: str, params: dict):
+        """
+        执行单个工具函数
+        :param func_name: 函数名称
+        :param params: 函数参数
+        :return:
+        """
+        raise NotImplementedError
+
+    def _callTools(self, func_tools: list) -> list:
+        """
+        执行本批次的函数调用
+        :param func_tools: 相互独立的函数调用列表
+        :return: 与调用顺序一致的结果列表
+        """
+        return self.scheduler.run(func_tools, self._callFunc)
+
+    def _unknownFuncs(self, func_tools: list) -> list:
+        """
+        本批次中找不到的函数名称，默认由函数的执行方报错
+        :param func_tools: 函数调用列表
+        :return:
+        """
+        return []
+
+    def _getFuncTools(self, inputs):
+        """
+        解析模型回复中的函数调用，常见的格式错误在本地修复，不再重新调用模型
+        :param inputs: 模型回复
+        :return: (是否解析成功, 函数调用列表)
+        """
+        result = parse_functools(inputs)
+        if result.repairs:
+            print(f"已修复模型回复格式：{result.repairs}")
+            for repair in result.repairs:
+                metrics.inc("agent_parse_repairs_total", repair=repair)
+        return result.status, result.func_tools
+
+    def _begin(self, session_id: str, inputs: str) -> str:
+        """
+        按 token 预算获取之前的对话上下文，并存储原始用户输入
+        :param session_id: 用户对话唯一标识
+        :param inputs: 用户输入
+        :return: 对话历史
+        """
+        context_str = self.context_builder.build(session_id, inputs)
+        self.message_store.store_message(session_id, Message(role="user", content=inputs))
+        return context_str
+
+    def _buildPrompt(self, inputs: str, func_results: list, history: str, func_names: list = None,
+                     pending: list = None) -> str:
+        """构建本轮提示词并记录耗时与长度"""
+        executor = type(self).__name__
+        with metrics.timer("agent_stage_seconds", executor=executor, stage="prompt"):
+            full_inputs = self._prompt(inputs, func_results, history, func_names, pending)
+        metrics.observe("agent_prompt_chars", len(full_inputs), executor=executor)
+        return full_inputs
+
+    def _checkResponse(self, count: int, response: str, func_tools: list = None):
+        """
+        输出本轮模型回复，文本模式下解析其中的函数调用
+        :param count: 当前轮次
+        :param response: 模型回复
+        :param func_tools: 原生函数调用读取到的函数调用列表
+        :return: (是否解析成功, 函数调用列表)
+        """
+        executor = type(self).__name__
+        metrics.observe("agent_response_chars", len(response or ""), executor=executor)
+
+        print(f"\n\n===================== 第 {count} 轮 结果=======================")
+        print(f"模型回复为：{response}")
+
+        if self.native_tools:
+            # 函数调用来自结构化字段，模型给出的参数无法解析时按格式不规范处理
+            status = func_tools is not None
+        else:
+            with metrics.timer("agent_stage_seconds", executor=executor, stage="parse"):
+                status, func_tools = self._getFuncTools(response)
+
+        if not status:
+            print(f"本次模型回复格式不规范...")
+            metrics.inc("agent_parse_failures_total", executor=executor)
+        return status, func_tools
+
+    def _turnMessages(self, response: str, func_tools: list, batch_results: list, func_results: list) -> List[Message]:
+        """
+        组织本轮需要存储的工具调用与结果消息，同时把结果追加到 func_results 中供下一轮提示词使用
+        :param response: 模型回复
+        :param func_tools: 本批次执行的函数调用
+        :param batch_results: 与调用顺序一致的结果列表
+        :param func_results: 本次对话中已执行的函数结果
+        :return:
+        """
+        turn_messages = [Message(role="assistant", content=response, metadata={"tools": func_tools})]
+
+        for func_tool, func_result in zip(func_tools, batch_results):
+            func_name = func_tool.get("func")
+            func_param = func_tool.get("params", {})
+            func_results.append(f"函数 {func_name} 的运行结果为 {func_result}")
+
+            print(f"函数 {func_name} 的运行结果为 {func_result}")
+
+            turn_messages.append(Message(
+                role="tool",
+                content=f"函数 {func_name} 调用结果为: {func_result}",
+                metadata={"tool": func_name, "args": func_param, "tool_result": True}
+            ))
+        return turn_messages
+
+    def __call__(self, session_id: str, inputs: str):
+        """
+        智能体执行入口
+        :param session_id: 用户对话唯一标识
+        :param inputs: 用户输入
+        :return:
+        """
+        count = 0
+        executor = type(self).__name__
+        try:
+            response = ""
+            func_results = []
+
+            # 对话上下文在本次对话中只读取一次
+            with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                context_str = self._begin(session_id, inputs)
+
+            # 只把与本次提问相关的函数放入提示词
+            func_names = self._selectFuncs(inputs)
+            tools = self._tools(func_names) if self.native_tools else None
+            cache = True
+            # 依赖上一批结果、尚未执行的函数调用，放入下一轮提示词
+            pending_tools = []
+
+            while True:
+                count += 1
+
+                if count > self.iter_num:
+                    print(f"达到最大迭代次数 {count} 次")
+                    break
+
+                metrics.inc("agent_iterations_total", executor=executor)
+
+                full_inputs = self._buildPrompt(inputs, func_results, context_str, func_names, pending_tools)
+
+                # 执行 大模型
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="invoke"):
+                    response, func_tools = self._invoke(full_inputs, tools, cache)
+
+                status, func_tools = self._checkResponse(count, response, func_tools)
+                # 格式错误的回复可能来自缓存，重试时跳过缓存重新调用模型
+                cache = status
+                if not status:
+                    continue
+
+                if len(func_tools) < 1:
+                    print(f"函数调用结束 或 没有可调用函数")
+                    with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                        self.message_store.store_message(session_id, Message(role="assistant", content=response))
+                    break
+
+                # 拆分出本批次可并行执行的函数调用，依赖其他函数结果的调用放入下一轮提示词
+                ready_tools, deferred_tools = self.scheduler.split(func_tools)
+
+                if self._unknownFuncs(ready_tools):
+                    break
+
+                metrics.observe("agent_tool_calls", len(ready_tools), executor=executor)
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="tools"):
+                    batch_results = self._callTools(ready_tools)
+
+                # 本轮的工具调用与全部结果在一个事务中写入
+                turn_messages = self._turnMessages(response, ready_tools, batch_results, func_results)
+                with metrics.timer("agent_stage_seconds", executor=executor, stage="storage"):
+                    self.message_store.store_messages(session_id, turn_messages)
+
+                pending_tools = deferred_tools
+                if deferred_tools:
+                    print(f"函数 {[f.get('func') for f in deferred_tools]} 依赖本批次结果，本轮未执行，已放入下一轮提示词")
+
+            return response
+        except Exception as e:
+            print(f"出现错误❌：{str(e)}")
+            return f"出现错误❌：{str(e)}"
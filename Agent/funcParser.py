@@ -0,0 +1,204 @@
+"""
+模型回复中 <functools> 标签的解析，能够修复模型常见的格式错误，减少因格式不规范而重新调用模型
+"""
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import List, Tuple
+import ast
+import json
+import re
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+
+# 只取第一处标签
+_functools_pattern = re.compile(r"<functools>(.*?)</functools>", flags=re.S)
+_code_fence = re.compile(r"^\s*```[A-Za-z]*\s*|\s*```\s*$")
+_json_literal = re.compile(r"\b(true|false|null)\b")
+_trailing_comma = re.compile(r",(?=\s*[\]}])")
+_python_literal = {"true": "True", "false": "False", "null": "None"}
+
+
+@dataclass
+class ParseResult:
+    """解析结果"""
+    status: bool                                        # 是否解析成功
+    func_tools: List[dict] = field(default_factory=list)  # 函数调用列表
+    repairs: List[str] = field(default_factory=list)      # 解析过程中做过的修复
+
+
+def _loadsJson(text: str):
+    try:
+        return True, _loads(text)
+    except ValueError:
+        return False, None
+
+
+def _loadsLiteral(text: str):
+    try:
+        return True, ast.literal_eval(text)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        # 如 {[1]: 2} 的不可哈希键会抛出 TypeError
+        return False, None
+
+
+def _splitStrings(text: str) -> List[Tuple[bool, str]]:
+    """
+    按字符串切分，单引号与双引号的字符串都能识别，处理转义；未闭合的字符串一直延续到末尾
+    :param text: 标签中的内容
+    :return: [(是否为字符串, 片段)]，字符串片段包含两端的引号
+    """
+    parts = []
+    start = 0
+    quote = None
+    escaped = False
+    for i, ch in enumerate(text):
+        if quote:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == quote:
+                parts.append((True, text[start:i + 1]))
+                start = i + 1
+                quote = None
+        elif ch in "\"'":
+            if i > start:
+                parts.append((False, text[start:i]))
+            start = i
+            quote = ch
+    if start < len(text):
+        parts.append((quote is not None, text[start:]))
+    return parts
+
+
+def _subOutsideStrings(pattern: re.Pattern, repl, text: str) -> str:
+    """只替换字符串以外的内容，不改变参数值"""
+    return "".join(part if quoted else pattern.sub(repl, part) for quoted, part in _splitStrings(text))
+
+
+def _stripTrailingCommas(text: str) -> str:
+    """
+    删除列表或对象末尾多余的逗号，跳过字符串中的内容
+    :param text: 标签中的内容
+    :return:
+    """
+    return _subOutsideStrings(_trailing_comma, "", text)
+
+
+def _loadsTolerant(text: str):
+    """
+    依次尝试严格解析与各种修复方式
+    :param text: 标签中的内容
+    :return: (是否成功, 解析结果, 修复列表)
+    """
+    ok, obj = _loadsJson(text)
+    if ok:
+        return True, obj, []
+
+    repairs = []
+
+    # ```json ... ``` 代码块
+    stripped = _code_fence.sub("", text)
+    if stripped != text:
+        repairs.append("code_fence")
+        text = stripped
+        ok, obj = _loadsJson(text)
+        if ok:
+            return True, obj, repairs
+
+    # 多个对象没有放在列表中
+    if text.lstrip().startswith("{") and text.rstrip().endswith("}") and re.search(r"}\s*,\s*{", text):
+        wrapped = f"[{text}]"
+        ok, obj = _loadsJson(wrapped)
+        if ok:
+            return True, obj, repairs + ["wrap_list"]
+        text = wrapped
+        repairs.append("wrap_list")
+
+    # 列表或对象末尾多余的逗号
+    no_comma = _stripTrailingCommas(text)
+    if no_comma != text:
+        ok, obj = _loadsJson(no_comma)
+        if ok:
+            return True, obj, repairs + ["trailing_comma"]
+
+    # Python 字面量：单引号、True/False/None、末尾逗号
+    ok, obj = _loadsLiteral(text)
+    if ok:
+        return True, obj, repairs + ["python_literal"]
+
+    # 单引号与 true/false/null 混用
+    mixed = _subOutsideStrings(_json_literal, lambda m: _python_literal[m.group(1)], text)
+    if mixed != text:
+        ok, obj = _loadsLiteral(mixed)
+        if ok:
+            return True, obj, repairs + ["python_literal", "json_literal"]
+
+    return False, None, repairs
+
+
+def parse_functools(text: str) -> ParseResult:
+    """
+    解析模型回复中的函数调用
+    :param text: 模型回复
+    :return:
+    """
+    if not text:
+        return ParseResult(True)
+
+    m = _functools_pattern.search(text)
+    if not m:
+        return ParseResult(True)  # 无标签就返回空列表
+
+    json_str = m.group(1).strip()
+    if json_str == "":
+        return ParseResult(True)
+
+    try:
+        ok, obj, repairs = _loadsTolerant(json_str)
+    except Exception as e:
+        # 修复过程中的意外错误按格式不规范处理，不中断本轮对话
+        print(f'❌ <functools> 内容解析出错：{e}')
+        ok, obj, repairs = False, None, []
+    if not ok:
+        print(f'❌ <functools> 内容解析失败：{json_str[:200]}')
+        return ParseResult(False, repairs=repairs)
+
+    # 统一成 list，多个对象末尾带逗号时 literal_eval 得到 tuple
+    if isinstance(obj, dict):
+        obj = [obj]
+    elif isinstance(obj, tuple):
+        obj = list(obj)
+    if not isinstance(obj, list) or not all(isinstance(item, dict) for item in obj):
+        print('❌ <functools> 内容必须是 dict 或 list[dict]')
+        return ParseResult(False, repairs=repairs)
+
+    return ParseResult(True, obj, repairs)
+
+
+def parse_arguments(arguments) -> Tuple[bool, dict]:
+    """
+    解析原生函数调用中的参数，常见的格式错误(如末尾多余的逗号)同样在本地修复
+    :param arguments: 参数的 JSON 文本，或已经解析好的字典
+    :return: (是否解析成功, 参数字典)，失败时参数为空字典
+    """
+    if isinstance(arguments, Mapping):
+        return True, dict(arguments)
+    if not arguments or not arguments.strip():
+        return True, {}
+
+    try:
+        ok, obj, repairs = _loadsTolerant(arguments)
+    except Exception as e:
+        print(f'❌ 函数参数解析出错：{e}')
+        ok, obj = False, None
+    if not ok or not isinstance(obj, dict):
+        print(f'❌ 函数参数解析失败：{arguments[:200]}')
+        return False, {}
+    return True, obj
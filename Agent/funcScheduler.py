@@ -0,0 +1,98 @@
+"""
+<functools> 中多个函数调用的调度：找出相互独立的调用，同一批次内并行执行
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+import asyncio
+import json
+import re
+
+
+class FuncScheduler:
+    """
+    函数调度器
+    模型一次返回多个函数调用时，参数中引用了其他函数结果的调用需要等待，其余调用在同一批次中并行执行，
+    本批次的全部结果在下一轮中一次性交给模型
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """
+        :param max_workers: 同一批次内并行执行的最大线程数
+        """
+        self.max_workers = max_workers
+        self._pool = None
+
+    @staticmethod
+    def _placeholder(func_names: set):
+        """
+        参数中表示 "引用其他函数结果" 的占位写法，只匹配同一回复中出现的函数名：
+        提示词约定的 "函数名的结果"，以及 ${函数名}、{{函数名}}
+        :param func_names: 同一回复中的函数名称
+        :return: 没有函数名时返回 None
+        """
+        names = "|".join(re.escape(name) for name in sorted(func_names, key=len, reverse=True) if name)
+        if not names:
+            return None
+        return re.compile(rf"(?:{names})的结果|\$\{{\s*(?:{names})\s*\}}|\{{\{{\s*(?:{names})\s*\}}\}}")
+
+    def _dependsOn(self, func_tool: dict, placeholder) -> bool:
+        """
+        判断函数调用的参数是否依赖其他函数的结果
+        :param func_tool: 函数调用 {"func": ..., "params": {...}}
+        :param placeholder: 同一回复中其他函数结果的占位写法
+        :return:
+        """
+        if placeholder is None:
+            return False
+        params = func_tool.get("params", {}) or {}
+        return placeholder.search(json.dumps(params, ensure_ascii=False)) is not None
+
+    def split(self, func_tools: List[dict]) -> Tuple[List[dict], List[dict]]:
+        """
+        将函数调用拆分为本批次可执行的调用与需要等待的调用
+        :param func_tools: 模型回复中解析出的函数调用列表
+        :return: (ready, deferred)
+        """
+        ready, deferred = [], []
+        for i, func_tool in enumerate(func_tools):
+            others = {f.get("func") for j, f in enumerate(func_tools) if j != i}
+            if self._dependsOn(func_tool, self._placeholder(others)):
+                deferred.append(func_tool)
+            else:
+                ready.append(func_tool)
+
+        # 全部存在依赖时，至少执行第一个调用，保证循环能够推进
+        if not ready and deferred:
+            ready.append(deferred.pop(0))
+        return ready, deferred
+
+    def run(self, func_tools: List[dict], invoke: Callable) -> list:
+        """
+        使用线程池并行执行一批函数调用，结果顺序与调用顺序一致
+        :param func_tools: 本批次的函数调用
+        :param invoke: 执行单个调用的函数，签名为 invoke(func_name, params)
+        :return:
+        """
+        if len(func_tools) == 1:
+            func_tool = func_tools[0]
+            return [invoke(func_tool.get("func"), func_tool.get("params", {}) or {})]
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [
+            self._pool.submit(invoke, func_tool.get("func"), func_tool.get("params", {}) or {})
+            for func_tool in func_tools
+        ]
+        return [future.result() for future in futures]
+
+    async def arun(self, func_tools: List[dict], invoke: Callable) -> list:
+        """
+        使用 asyncio 并发执行一批函数调用，结果顺序与调用顺序一致
+        :param func_tools: 本批次的函数调用
+        :param invoke: 执行单个调用的协程函数，签名为 invoke(func_name, params)
+        :return:
+        """
+        return await asyncio.gather(*[
+            invoke(func_tool.get("func"), func_tool.get("params", {}) or {})
+            for func_tool in func_tools
+        ])
@@ -0,0 +1,58 @@
+"""
+智能体提示词构建
+"""
+from typing import Iterable, List
+import json
+from Utils.config import Config
+
+
+class PromptBuilder:
+    """
+    结构化提示词构建器
+    默认提示词、用例与函数信息组成的静态前缀只构建一次，每轮只拼接对话历史、原始用户输入与新增的函数结果，
+    避免把上一轮的完整提示词再次嵌入到新提示词中
+    """
+
+    def __init__(self, func_infos: Iterable[str], native: bool = False):
+        """
+        :param func_infos: 各个函数的介绍信息
+        :param native: 是否为原生函数调用模式，函数信息通过模型的 tools 参数传入，提示词中不再包含用例与函数信息
+        """
+        self.native = native
+        if native:
+            self.base = self.prefix = Config.native_prompt
+            return
+        self.base = Config.default_prompt + Config.few_shot
+        self.prefix = self.base + self.formatFuncs(func_infos)
+
+    @staticmethod
+    def formatFuncs(func_infos: Iterable[str]) -> str:
+        """函数信息部分"""
+        func_info = "".join(v + "。" for v in func_infos)
+        return f"\n函数信息：{func_info}"
+
+    def build(self, inputs: str, func_results: List[str] = None, history: str = "",
+              func_infos: Iterable[str] = None, pending: List[dict] = None) -> str:
+        """
+        组织模型输入
+        :param inputs: 原始用户输入
+        :param func_results: 本次对话中已执行的函数结果
+        :param history: 对话历史
+        :param func_infos: 本次使用的函数信息，为 None 时使用全部函数
+        :param pending: 上一轮中依赖其他函数结果、尚未执行的函数调用，由模型代入结果后重新调用
+        :return:
+        """
+        if func_infos is None or self.native:
+            parts = [self.prefix]
+        else:
+            parts = [self.base + self.formatFuncs(func_infos)]
+        if history:
+            parts.append(f"\n对话历史：\n{history}")
+        parts.append(f"\n用户输入：{inputs}")
+        if func_results:
+            parts.append(f"\n已执行的函数结果为：{';'.join(func_results)}")
+        if pending:
+            calls = json.dumps(pending, ensure_ascii=False, default=str)
+            parts.append(f"\n待执行：{calls}，这些函数调用依赖上面的函数结果，尚未执行，请代入结果后重新调用")
+        parts.append("\n助手：")
+        return "".join(parts)
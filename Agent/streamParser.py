@@ -0,0 +1,58 @@
+"""
+流式模型输出的增量解析，在 <functools>...</functools> 闭合时立即给出结果
+"""
+
+
+class FuncToolsStreamParser:
+    """
+    增量解析器
+    每次 feed 一段模型输出，只扫描新增的文本；检测到完整的 <functools> 标签块后，
+    调用方即可停止接收剩余输出并开始执行函数
+    """
+
+    open_tag = "<functools>"
+    close_tag = "</functools>"
+
+    def __init__(self):
+        self._buffer = ""
+        self._open_pos = -1
+        self._scan_pos = 0
+        self.closed = False
+
+    @property
+    def text(self) -> str:
+        """
+        目前为止接收到的模型输出，标签闭合后截断到闭合标签处
+        :return:
+        """
+        return self._buffer
+
+    def feed(self, chunk: str) -> bool:
+        """
+        追加一段模型输出
+        :param chunk: 新增文本
+        :return: 是否已经得到完整的 <functools> 标签块
+        """
+        if self.closed or not chunk:
+            return self.closed
+
+        self._buffer += chunk
+
+        # 标签可能被拆在两段输出之间，回退一个标签长度后再查找
+        if self._open_pos < 0:
+            pos = self._buffer.find(self.open_tag, max(0, self._scan_pos - len(self.open_tag)))
+            if pos < 0:
+                self._scan_pos = len(self._buffer)
+                return False
+            self._open_pos = pos
+            self._scan_pos = pos + len(self.open_tag)
+
+        pos = self._buffer.find(self.close_tag, max(self._open_pos + len(self.open_tag),
+                                                    self._scan_pos - len(self.close_tag)))
+        if pos < 0:
+            self._scan_pos = len(self._buffer)
+            return False
+
+        self._buffer = self._buffer[:pos + len(self.close_tag)]
+        self.closed = True
+        return True
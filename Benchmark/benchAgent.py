@@ -0,0 +1,192 @@
+"""
+智能体循环的离线基准测试
+
+使用 MockModel 替代真实模型，测量 AgentExcuter 与 AgentRemoteExcuter(连接本地启动的 Interface/main.py 服务)的
+每轮额外开销、提示词长度、sqlite 耗时与端到端吞吐，结果以 JSON 输出，便于跟踪性能回归。
+
+    python -m Benchmark.benchAgent --runs 20 --rounds 3 --output bench_agent.json
+"""
+from Benchmark.mockModel import MockModel
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import statistics
+import tempfile
+import threading
+import time
+
+
+class TimedMemorySystem(MemorySystem):
+    """记录 sqlite 读写耗时的记忆系统"""
+
+    def __init__(self, *args, **kwargs):
+        self.sqlite_seconds = 0.0
+        super().__init__(*args, **kwargs)
+
+    def _timed(self, method, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            self.sqlite_seconds += time.perf_counter() - start
+
+    def store_messages(self, *args, **kwargs):
+        return self._timed(super().store_messages, *args, **kwargs)
+
+    def get_recent_context(self, *args, **kwargs):
+        return self._timed(super().get_recent_context, *args, **kwargs)
+
+    def get_recent_with_tokens(self, *args, **kwargs):
+        return self._timed(super().get_recent_with_tokens, *args, **kwargs)
+
+
+def add(a: float, b: float):
+    """
+    将两个数据进行相加
+    """
+    return a + b
+
+
+ADD_CODE = "def add(a: float, b: float):\n    return a + b\n"
+ADD_INFO = "函数 add 的作用为 将两个数据进行相加,参数为 a,类型为 float,是否必须: 是,默认值为 None;参数为 b,类型为 float,是否必须: 是,默认值为 None"
+
+
+def _summary(values: list) -> dict:
+    if not values:
+        return {}
+    values = sorted(values)
+    return {
+        "mean": statistics.fmean(values),
+        "p50": values[len(values) // 2],
+        "p95": values[min(len(values) - 1, int(len(values) * 0.95))],
+        "max": values[-1],
+    }
+
+
+def _measure(build_agent, runs: int, rounds: int, latency: float, tmp_dir: str) -> dict:
+    """
+    重复执行智能体并汇总指标
+    :param build_agent: build_agent(model, message_store) 返回智能体
+    :param runs: 执行次数
+    :param rounds: 每次执行中的函数调用轮数
+    :param latency: 模拟模型耗时(秒)
+    :param tmp_dir: 临时数据库目录
+    :return:
+    """
+    store = TimedMemorySystem(os.path.join(tmp_dir, f"bench_{time.time_ns()}.db"))
+    durations, overheads, prompt_sizes = [], [], []
+    iterations = 0
+
+    start_all = time.perf_counter()
+    for i in range(runs):
+        model = MockModel.toolScript("add", {"a": 1.1, "b": 3.3}, rounds, latency)
+        agent = build_agent(model, store)
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            agent(f"bench_{i % 4}", "请计算1.1与3.3的和")
+        duration = time.perf_counter() - start
+
+        durations.append(duration)
+        overheads.append((duration - model.calls * latency) / model.calls)
+        prompt_sizes.extend(model.prompt_sizes)
+        iterations += model.calls
+    total = time.perf_counter() - start_all
+    store.close()
+
+    return {
+        "runs": runs,
+        "iterations": iterations,
+        "run_seconds": _summary(durations),
+        "iteration_overhead_seconds": _summary(overheads),
+        "prompt_chars": _summary(prompt_sizes),
+        "sqlite_seconds_total": store.sqlite_seconds,
+        "sqlite_seconds_per_iteration": store.sqlite_seconds / iterations,
+        "throughput_runs_per_second": runs / total,
+    }
+
+
+def benchLocal(runs: int, rounds: int, latency: float, tmp_dir: str) -> dict:
+    """AgentExcuter，使用本地工具"""
+    from Agent.agentExcuter import AgentExcuter
+
+    def build_agent(model, store):
+        return AgentExcuter(model, {"add": ADD_INFO}, {"add": add}, message_store=store)
+
+    return _measure(build_agent, runs, rounds, latency, tmp_dir)
+
+
+def _freePort() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def benchRemote(runs: int, rounds: int, latency: float, tmp_dir: str) -> dict:
+    """AgentRemoteExcuter，工具运行在本地启动的工具中心"""
+    from Interface.Utils.config import Config
+    Config.registry_path = os.path.join(tmp_dir, "bench_registry.db")
+
+    import uvicorn
+    from Interface.main import app
+    from Agent.agentRemoteExcuter import AgentRemoteExcuter
+    from Utils.httpSession import get_session
+
+    port = _freePort()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="error"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+        get_session().post(f"{base_url}/register/func", json={
+            "func_name": "add", "func_info": ADD_INFO, "func_code": ADD_CODE,
+        }).raise_for_status()
+        func_doc = get_session().get(f"{base_url}/list").json()["funcs"]
+
+        def build_agent(model, store):
+            return AgentRemoteExcuter(model, func_doc, f"{base_url}/excuter/call", message_store=store)
+
+        return _measure(build_agent, runs, rounds, latency, tmp_dir)
+    finally:
+        server.should_exit = True
+        thread.join(timeout=5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="智能体循环离线基准测试")
+    parser.add_argument("--runs", type=int, default=20, help="每个场景的执行次数")
+    parser.add_argument("--rounds", type=int, default=3, help="每次执行中的函数调用轮数")
+    parser.add_argument("--latency", type=float, default=0.0, help="模拟模型耗时(秒)")
+    parser.add_argument("--scenarios", default="local,remote", help="执行的场景，逗号分隔")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径，默认只打印")
+    args = parser.parse_args()
+
+    benches = {"local": benchLocal, "remote": benchRemote}
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "params": {"runs": args.runs, "rounds": args.rounds, "latency": args.latency},
+        "scenarios": {},
+    }
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name in args.scenarios.split(","):
+            results["scenarios"][name] = benches[name](args.runs, args.rounds, args.latency, tmp_dir)
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
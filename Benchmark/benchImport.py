@@ -0,0 +1,76 @@
+"""
+导入耗时基准测试
+
+每个场景在新的解释器进程中执行，扣除空解释器的启动耗时后取中位数，并记录是否加载了 openai / ollama SDK。
+
+    python -m Benchmark.benchImport --repeat 5 --output bench_import.json
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+
+SCENARIOS = {
+    "core": "import Core.basicModel",
+    "agent": "import Agent.agentExcuter",
+    "openai_provider": "import LLM.OpenaiImpl.openaiModel",
+    "ollama_provider": "import LLM.OllamaImpl.ollamaModel",
+    "create_ollama": (
+        "from Core.basicModel import BasicModel\n"
+        "from Utils.modelEnum import ModelEnum\n"
+        "BasicModel.createModel(class_name=ModelEnum.Ollama, model_name='bench', model_url='http://127.0.0.1:11434')"
+    ),
+}
+
+# 子进程执行完场景后输出已加载的 SDK
+_REPORT = "\nimport sys, json\nprint(json.dumps({'openai': 'openai' in sys.modules, 'ollama': 'ollama' in sys.modules, 'modules': len(sys.modules)}))"
+
+
+def _run(code: str, cwd: str):
+    start = time.perf_counter()
+    output = subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True).stdout
+    return time.perf_counter() - start, output
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导入耗时基准测试")
+    parser.add_argument("--repeat", type=int, default=5, help="每个场景的重复次数")
+    parser.add_argument("--output", default=None, help="结果 JSON 文件路径，默认只打印")
+    args = parser.parse_args()
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    baseline = statistics.median(_run("pass", root)[0] for _ in range(args.repeat))
+
+    results = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "interpreter_seconds": baseline,
+        "scenarios": {},
+    }
+    for name, code in SCENARIOS.items():
+        durations = []
+        loaded = {}
+        for _ in range(args.repeat):
+            duration, output = _run(code + _REPORT, root)
+            durations.append(duration)
+            loaded = json.loads(output.strip().splitlines()[-1])
+        results["scenarios"][name] = {
+            "import_seconds": max(0.0, statistics.median(durations) - baseline),
+            **loaded,
+        }
+
+    text = json.dumps(results, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
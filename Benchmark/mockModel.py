@@ -0,0 +1,59 @@
+"""
+离线基准测试使用的本地模型，按脚本返回固定回复，不依赖任何模型服务
+"""
+from Core.basicModel import BasicModel
+from typing import List
+import asyncio
+import time
+
+
+class MockModel(BasicModel, register=False):
+    """
+    脚本化模型
+    每次调用按顺序返回 replies 中的一条回复，到末尾后从头开始；latency 模拟模型耗时
+    """
+
+    def __init__(self, replies: List[str], latency: float = 0.0, model_name: str = "mock"):
+        """
+        :param replies: 依次返回的回复
+        :param latency: 每次调用的模拟耗时(秒)
+        :param model_name: 模型名称
+        """
+        super().__init__(model_name, "mock://local", None)
+        self.replies = replies
+        self.latency = latency
+        self.calls = 0
+        self.prompt_sizes = []
+
+    @classmethod
+    def toolScript(cls, func_name: str, params: dict, tool_rounds: int, latency: float = 0.0, final: str = "完成"):
+        """
+        生成 tool_rounds 轮函数调用后给出最终回复的脚本
+        :param func_name: 调用的函数名称
+        :param params: 函数参数
+        :param tool_rounds: 函数调用轮数
+        :param latency: 每次调用的模拟耗时(秒)
+        :param final: 最终回复
+        :return:
+        """
+        import json
+        call = json.dumps([{"func": func_name, "params": params}], ensure_ascii=False)
+        replies = [f"<functools>{call}</functools>"] * tool_rounds + [f"{final}<functools></functools>"]
+        return cls(replies, latency)
+
+    def _next(self, messages) -> str:
+        messages = self._formatMessages(messages)
+        self.prompt_sizes.append(sum(len(m.get("content", "")) for m in messages))
+        reply = self.replies[self.calls % len(self.replies)]
+        self.calls += 1
+        return reply
+
+    def invoke(self, *args, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        return self._next(kwargs.get("messages", ""))
+
+    async def ainvoke(self, *args, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self._next(kwargs.get("messages", ""))
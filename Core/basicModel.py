@@ -1,5 +1,9 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
+from Utils.modelEnum import ModelEnum
+import asyncio
+import importlib
 
 
 class BasicModel(ABC):
@@ -7,18 +11,36 @@ class BasicModel(ABC):
     # 子类信息存储
     _registered_models = {}
 
+    # 模型提供方实现所在的模块，createModel 第一次用到时才导入，避免加载用不到的 SDK
+    _provider_modules = {
+        ModelEnum.Openai: "LLM.OpenaiImpl.openaiModel",
+        ModelEnum.Ollama: "LLM.OllamaImpl.ollamaModel",
+    }
+
     def __init__(self, model_name: Optional[str] = None, model_url: Optional[str] = None, api_key: Optional[str] = None):
         self.model_name = model_name
         self.model_url = model_url
         self.api_key = api_key
 
-    # 自动将 子类 注册到 _registered_models 中
-    def __init_subclass__(cls, **kwargs):
+    # 自动将 子类 注册到 _registered_models 中，包装类等不能直接创建的子类可以通过 register=False 跳过
+    def __init_subclass__(cls, register: bool = True, **kwargs):
         super().__init_subclass__(**kwargs)
+        if not register:
+            return
         class_name = cls.__name__.lower()
 
         BasicModel._registered_models[class_name] = cls
 
+    @classmethod
+    def registerProvider(cls, class_name: ModelEnum, module_path: str):
+        """
+        登记模型提供方实现所在的模块，模块在 createModel 第一次使用时导入
+        :param class_name: 模型枚举
+        :param module_path: 模块路径，如 LLM.OllamaImpl.ollamaModel
+        :return:
+        """
+        cls._provider_modules[class_name] = module_path
+
     @classmethod
     def createModel(cls, *args, **kwargs):
         class_name = kwargs.get('class_name', None)
@@ -26,8 +48,12 @@ class BasicModel(ABC):
         if class_name is None:
             raise KeyError('Class name must be provided')
 
+        module_path = cls._provider_modules.get(class_name)
         class_name = class_name.value
 
+        if class_name not in cls._registered_models and module_path is not None:
+            importlib.import_module(module_path)
+
         model_name = kwargs.get('model_name', None)
         model_url = kwargs.get('model_url', None)
         api_key = kwargs.get('api_key', None)
@@ -38,8 +64,113 @@ class BasicModel(ABC):
         model = cls._registered_models[class_name](model_name, model_url, api_key)
         return model
 
+    @staticmethod
+    def _formatMessages(inputs) -> List[dict]:
+        """
+        将 str / dict / list 形式的输入统一为消息列表
+        :param inputs: 模型输入
+        :return:
+        """
+        if isinstance(inputs, str):
+            return [
+                {
+                    "role": "user",
+                    "content": inputs
+                }
+            ]
+
+        elif isinstance(inputs, dict):
+            return [inputs]
+
+        elif isinstance(inputs, list):
+            return inputs
+
+        raise ValueError("Invalid inputs, only str or dict or list")
+
     @abstractmethod
     def invoke(self, *args, **kwargs):
         raise KeyError('Method not implemented')
 
+    async def ainvoke(self, *args, **kwargs):
+        """
+        异步模型调用，子类未提供原生异步实现时，放到线程中执行 invoke，避免阻塞事件循环
+        :return:
+        """
+        return await asyncio.to_thread(self.invoke, *args, **kwargs)
+
+    def stream_invoke(self, *args, **kwargs):
+        """
+        流式模型调用，逐段返回模型输出的文本
+        子类未提供流式实现时，一次性返回 invoke 的完整结果
+        :return:
+        """
+        yield self.invoke(*args, **kwargs)
+
+    async def astream_invoke(self, *args, **kwargs):
+        """
+        异步流式模型调用，逐段返回模型输出的文本
+        :return:
+        """
+        yield await self.ainvoke(*args, **kwargs)
+
+    def invoke_tools(self, *args, **kwargs) -> dict:
+        """
+        原生函数调用，工具描述通过 tools 参数传给模型，函数调用从结构化字段中读取
+        :param messages: 模型输入
+        :param tools: 工具描述列表
+        :return: {"content": 回复文本, "func_tools": [{"func": 函数名, "params": 参数}], "status": 参数是否解析成功}
+        """
+        raise NotImplementedError(f"{type(self).__name__} 不支持原生函数调用")
+
+    async def ainvoke_tools(self, *args, **kwargs) -> dict:
+        """
+        异步原生函数调用，子类未提供原生异步实现时，放到线程中执行 invoke_tools
+        :return:
+        """
+        return await asyncio.to_thread(self.invoke_tools, *args, **kwargs)
+
+    def _batchItem(self, messages) -> dict:
+        """执行批量调用中的一条，错误只记录在本条结果中"""
+        try:
+            return {"result": self.invoke(messages=messages)}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def batch_invoke(self, list_of_messages: list, max_concurrency: int = 8) -> List[dict]:
+        """
+        批量模型调用，最多 max_concurrency 个请求同时进行
+        :param list_of_messages: 多条模型输入，每条的格式与 invoke 的 messages 相同
+        :param max_concurrency: 最大并发数
+        :return: 与输入顺序一致的结果列表，成功为 {"result": 回复}，失败为 {"error": 错误信息}
+        """
+        if not list_of_messages:
+            return []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(list_of_messages)))) as pool:
+            return list(pool.map(self._batchItem, list_of_messages))
+
+    async def abatch_invoke(self, list_of_messages: list, max_concurrency: int = 8) -> List[dict]:
+        """
+        异步批量模型调用，最多 max_concurrency 个请求同时进行
+        :param list_of_messages: 多条模型输入
+        :param max_concurrency: 最大并发数
+        :return: 与输入顺序一致的结果列表
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def run(messages):
+            async with semaphore:
+                try:
+                    return {"result": await self.ainvoke(messages=messages)}
+                except Exception as e:
+                    return {"error": f"{type(e).__name__}: {e}"}
+
+        return list(await asyncio.gather(*[run(messages) for messages in list_of_messages]))
 
+    @staticmethod
+    def _inEventLoop() -> bool:
+        """当前线程是否正在运行事件循环"""
+        try:
+            asyncio.get_running_loop()
+            return True
+        except RuntimeError:
+            return False
@@ -0,0 +1,112 @@
+from fastapi import APIRouter, HTTPException
+from pydantic import BaseModel
+from Interface.Utils.config import Config
+from Interface.Utils.agentScheduler import agent_scheduler, QueueFullError
+from Interface.Utils.funcExecutor import func_executor
+from Interface.Utils.funcRegistry import func_registry
+from Agent.asyncAgentExcuter import AsyncAgentExcuter
+from Tools.funcSchema import schema_from_info
+from Core.basicModel import BasicModel
+from LLM.RouterImpl.routerModel import RouterModel
+from Utils.modelEnum import ModelEnum
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+import asyncio
+
+
+agent_router = APIRouter(prefix="/agent", tags=["智能体执行中心"])
+
+
+class RegistryFuncs:
+    """
+    把工具中心注册的函数提供给智能体执行器，调用经过执行后端，带有超时与并发控制；
+    超时与调用失败和 /excuter/batch 一样作为本次调用的结果返回给模型，不中断本轮对话
+    """
+
+    def get(self, func_name: str, default=None):
+        if func_registry.get_func(func_name) is None:
+            return default
+
+        async def call(**params):
+            try:
+                return await func_executor.run(func_name, params)
+            except asyncio.TimeoutError:
+                return f"调用超时: 函数 {func_name}"
+            except Exception as e:
+                return f"调用失败: 函数 {func_name}: {type(e).__name__}: {e}"
+        return call
+
+    def __getitem__(self, func_name: str):
+        func = self.get(func_name)
+        if func is None:
+            raise KeyError(func_name)
+        return func
+
+
+_model = None
+_message_store = None
+
+
+def _getModel() -> BasicModel:
+    """按配置创建服务使用的模型，进程内共享"""
+    global _model
+    if _model is None and isinstance(Config.agent_model_url, (list, tuple)):
+        # 多个地址时按延迟与错误率在各后端之间路由
+        _model = RouterModel.fromUrls(
+            ModelEnum[Config.agent_model_class],
+            Config.agent_model_name,
+            Config.agent_model_url,
+            Config.agent_api_key,
+        )
+    elif _model is None:
+        _model = BasicModel.createModel(
+            class_name=ModelEnum[Config.agent_model_class],
+            model_name=Config.agent_model_name,
+            model_url=Config.agent_model_url,
+            api_key=Config.agent_api_key,
+        )
+    return _model
+
+
+def _getMessageStore() -> MemorySystem:
+    global _message_store
+    if _message_store is None:
+        _message_store = MemorySystem(Config.agent_memory_path)
+    return _message_store
+
+
+class RunIn(BaseModel):
+    session_id: str     # 用户对话唯一标识
+    inputs: str         # 用户输入
+
+
+@agent_router.post("/run")
+async def run(body: RunIn):
+    """
+    执行一轮智能体对话，同一 session_id 的请求按到达顺序依次执行
+    """
+    func_registry.refresh()
+    agent = AsyncAgentExcuter(
+        _getModel(),
+        dict(Config.register_funDoc),
+        RegistryFuncs(),
+        iter_num=Config.agent_iter_num,
+        message_store=_getMessageStore(),
+        top_k=Config.agent_tool_top_k,
+        tool_index=Config.tool_index,
+        native_tools=Config.agent_native_tools,
+        func_schema={name: Config.register_funSchema.get(name) or schema_from_info(name, info)
+                     for name, info in Config.register_funDoc.items()},
+    )
+    try:
+        response = await agent_scheduler.submit(body.session_id, lambda: agent(body.session_id, body.inputs))
+    except QueueFullError as e:
+        raise HTTPException(429, str(e), headers={"Retry-After": "1"})
+    return {"session_id": body.session_id, "response": response}
+
+
+@agent_router.get("/queue")
+def queue():
+    """
+    返回任务队列状态
+    """
+    return agent_scheduler.stats()
@@ -1,6 +1,10 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from Interface.Utils.config import Config
+from Interface.Utils.funcExecutor import func_executor
+from Interface.Utils.funcRegistry import func_registry
+from typing import List
+import asyncio
 import traceback
 
 
@@ -14,11 +18,48 @@ class CallIn(BaseModel):
 
 
 @excuter_router.post("/call")
-def call(body: CallIn):
-    if body.func not in Config.register_funObject:
+async def call(body: CallIn):
+    if func_registry.get_func(body.func) is None:
         raise HTTPException(400, "函数未注册")
     try:
-        result = Config.register_funObject[body.func](**body.params)
+        result = await func_executor.run(body.func, body.params)
         return {"result": result}
+    except asyncio.TimeoutError:
+        raise HTTPException(504, f"调用超时: 函数 {body.func}")
     except Exception as e:
-        raise HTTPException(500, f"调用失败: {traceback.format_exc()}")
\ No newline at end of file
+        raise HTTPException(500, f"调用失败: {traceback.format_exc()}")
+
+
+# ---------- 3. 批量调用接口 ----------
+class BatchIn(BaseModel):
+    items: List[CallIn]     # 多个函数调用
+
+
+async def _callItem(item: CallIn) -> dict:
+    """
+    执行单个调用，错误只记录在本条结果中，不影响其他调用
+    """
+    if func_registry.get_func(item.func) is None:
+        return {"error": "函数未注册"}
+    try:
+        return {"result": await func_executor.run(item.func, item.params)}
+    except asyncio.TimeoutError:
+        return {"error": f"调用超时: 函数 {item.func}"}
+    except Exception:
+        return {"error": f"调用失败: {traceback.format_exc()}"}
+
+
+@excuter_router.post("/batch")
+async def batch(body: BatchIn):
+    results = await asyncio.gather(*[_callItem(item) for item in body.items])
+    return {"results": list(results)}
+
+
+@excuter_router.get("/cache")
+def cache_stats():
+    """
+    返回已开启缓存的函数的命中统计
+    :return:
+    """
+    return {name: func.cache_stats() for name, func in Config.register_funObject.items()
+            if hasattr(func, "cache_stats")}
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from Interface.Utils.config import Config
+from typing import Optional
+from Interface.Utils.funcRegistry import func_registry
 import traceback
 
 register_router = APIRouter(prefix="/register", tags=["工具注册中心"])
@@ -10,6 +11,13 @@ class RegisterIn(BaseModel):
     func_name: str      # 函数名
     func_info: str      # 函数信息
     func_code: str      # 函数完整源码
+    func_schema: Optional[dict] = None      # JSON 工具描述，用于原生函数调用
+    cache: bool = False         # 是否缓存函数结果，只用于只读函数，不能与 process 后端同时使用
+    cache_ttl: float = 60       # 缓存过期时间(秒)
+    cache_maxsize: int = 128    # 最大缓存条数
+    backend: str = "thread"                 # 执行后端，I/O 密集型用 thread，CPU 密集型用 process
+    timeout: Optional[float] = None         # 单次调用超时时间(秒)
+    max_concurrency: Optional[int] = None   # 同时执行的最大调用数
 
 
 @register_router.post("/func")
@@ -19,15 +27,20 @@ def register(body: RegisterIn):
     源码里必须定义一个同名函数，否则会报错。
     """
     try:
-        # 执行源码，产生局部命名空间
-        loc: dict = {}
-        exec(body.func_code, globals(), loc)
-
-        if body.func_name not in loc:
-            raise ValueError(f"源码中找不到函数 {body.func_name}")
-
-        Config.register_funObject[body.func_name] = loc[body.func_name]
-        Config.register_funDoc[body.func_name] = body.func_info
+        if body.backend not in ("thread", "process"):
+            raise ValueError(f"不支持的执行后端 {body.backend}")
+        if body.cache and body.backend == "process":
+            # 子进程中直接执行源码，不经过结果缓存
+            raise ValueError("process 后端不支持结果缓存，请使用 thread 后端或关闭 cache")
+
+        func_registry.register(body.func_name, body.func_code, body.func_info, {
+            "backend": body.backend,
+            "timeout": body.timeout,
+            "max_concurrency": body.max_concurrency,
+            "cache": body.cache,
+            "cache_ttl": body.cache_ttl,
+            "cache_maxsize": body.cache_maxsize,
+        }, body.func_schema)
 
         return {"msg": f"函数 {body.func_name} 已注册"}
     except Exception as e:
@@ -0,0 +1,90 @@
+"""
+智能体任务调度：不同会话并发执行，同一会话的任务严格按提交顺序执行，排队任务超过上限时拒绝新任务
+"""
+from Interface.Utils.config import Config
+from Utils.metrics import metrics
+from typing import Awaitable, Callable
+import asyncio
+import time
+
+
+class QueueFullError(Exception):
+    """排队任务数达到上限"""
+
+
+class AgentScheduler:
+    """
+    会话级有序调度器
+    每个会话一把先进先出的锁保证顺序，全局信号量限制同时执行的任务数
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None):
+        """
+        :param max_workers: 同时执行的最大任务数
+        :param max_queue: 最大排队任务数，超过时 submit 抛出 QueueFullError
+        """
+        self.max_workers = max_workers or Config.agent_workers
+        self.max_queue = max_queue or Config.agent_max_queue
+        self.queued = 0
+        self.running = 0
+        self._semaphore = None
+        self._sessions = {}
+
+    def _sessionLock(self, session_id: str) -> list:
+        """获取会话锁，返回 [锁, 引用数]"""
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = [asyncio.Lock(), 0]
+            self._sessions[session_id] = entry
+        entry[1] += 1
+        return entry
+
+    def _releaseSession(self, session_id: str, entry: list):
+        entry[1] -= 1
+        if entry[1] == 0:
+            self._sessions.pop(session_id, None)
+
+    async def submit(self, session_id: str, job: Callable[[], Awaitable]):
+        """
+        提交任务并等待结果
+        :param session_id: 用户对话唯一标识
+        :param job: 无参数的协程函数
+        :return: job 的返回值
+        """
+        if self.queued >= self.max_queue:
+            raise QueueFullError(f"排队任务数已达上限 {self.max_queue}")
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_workers)
+
+        self.queued += 1
+        waiting = True
+        enqueued_at = time.perf_counter()
+        entry = self._sessionLock(session_id)
+        try:
+            async with entry[0]:
+                async with self._semaphore:
+                    self.queued -= 1
+                    waiting = False
+                    metrics.observe("agent_queue_seconds", time.perf_counter() - enqueued_at)
+                    self.running += 1
+                    try:
+                        return await job()
+                    finally:
+                        self.running -= 1
+        finally:
+            if waiting:
+                self.queued -= 1
+            self._releaseSession(session_id, entry)
+
+    def stats(self) -> dict:
+        """队列状态"""
+        return {
+            "queued": self.queued,
+            "running": self.running,
+            "sessions": len(self._sessions),
+            "max_queue": self.max_queue,
+            "max_workers": self.max_workers,
+        }
+
+
+agent_scheduler = AgentScheduler()
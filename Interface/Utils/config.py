@@ -1,6 +1,58 @@
+from Utils.toolIndex import ToolIndex
+
+
 class Config:
     # 注册函数的信息
     register_funDoc = {}
 
+    # 注册函数的 JSON 工具描述，客户端注册时生成
+    register_funSchema = {}
+
+    # 注册函数信息的检索索引，注册与刷新注册表时增量更新
+    tool_index = ToolIndex()
+
     # 注册函数本身
-    register_funObject = {}
\ No newline at end of file
+    register_funObject = {}
+
+    # 注册函数的源码，进程池执行时在子进程中编译
+    register_funCode = {}
+
+    # 持久化注册表路径，服务重启后无需客户端重新注册
+    registry_path = "func_registry.db"
+
+    # 多个 worker 共享注册表时，检查注册表版本号的最小间隔(秒)
+    registry_refresh_interval = 1.0
+
+    # 注册函数的执行配置：backend(thread/process)、timeout、max_concurrency 与缓存配置
+    register_funOption = {}
+
+    # 线程池大小，用于 I/O 密集型函数
+    thread_workers = 32
+
+    # 进程池大小，用于 CPU 密集型函数，为 0 时不启动进程池
+    process_workers = 2
+
+    # 智能体服务使用的模型，agent_model_class 为 ModelEnum 的成员名；
+    # agent_model_url 为地址列表时，按延迟与错误率在多个后端之间路由，并支持对冲请求与熔断
+    agent_model_class = "Ollama"
+    agent_model_name = None
+    agent_model_url = None
+    agent_api_key = None
+
+    # 智能体服务每次提问放入提示词的最相关函数个数，为 None 时放入全部函数
+    agent_tool_top_k = None
+
+    # 智能体服务是否使用模型的原生函数调用
+    agent_native_tools = False
+
+    # 智能体服务的最大迭代次数
+    agent_iter_num = 10
+
+    # 智能体服务的对话历史存储路径
+    agent_memory_path = "agent_memory.db"
+
+    # 智能体服务同时执行的最大任务数
+    agent_workers = 64
+
+    # 智能体服务的最大排队任务数，超过时返回 429
+    agent_max_queue = 1024
@@ -0,0 +1,147 @@
+"""
+注册函数的执行后端：线程池、预热的进程池与原生 async 函数，支持按函数配置超时与并发上限
+"""
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from functools import partial
+from Interface.Utils.config import Config
+from Interface.Utils.funcRegistry import func_registry
+from Utils.metrics import metrics
+import asyncio
+import hashlib
+import inspect
+import os
+
+
+# 子进程中按源码哈希缓存已编译的函数
+_process_funcs = {}
+
+
+def _warmUp():
+    """进程池预热，提前启动子进程"""
+    return os.getpid()
+
+
+def _runInProcess(func_name: str, func_code: str, params: dict):
+    """
+    在子进程中执行函数，同一份源码只编译一次
+    :param func_name: 函数名称
+    :param func_code: 函数源码
+    :param params: 函数参数
+    :return:
+    """
+    key = hashlib.sha256(func_code.encode("utf-8")).hexdigest()
+    func = _process_funcs.get(key)
+    if func is None:
+        namespace: dict = {}
+        exec(func_code, namespace)
+        func = namespace[func_name]
+        _process_funcs[key] = func
+    return func(**params)
+
+
+class FuncExecutor:
+    """
+    函数执行器
+    backend 为 thread 时在线程池中执行，为 process 时在进程池中执行，async def 函数直接在事件循环中 await；
+    超时抛出 asyncio.TimeoutError，超过并发上限的调用排队等待，超时的调用结束前仍占用并发名额；
+    process 后端在子进程中重新编译源码执行，不经过结果缓存，注册时不允许与 cache 同时使用
+    """
+
+    def __init__(self, thread_workers: int = None, process_workers: int = None):
+        """
+        :param thread_workers: 线程池大小
+        :param process_workers: 进程池大小
+        """
+        self.thread_workers = thread_workers or Config.thread_workers
+        self.process_workers = Config.process_workers if process_workers is None else process_workers
+        self._thread_pool = None
+        self._process_pool = None
+        self._semaphores = {}
+
+    def start(self):
+        """启动线程池，启动并预热进程池"""
+        if self._thread_pool is None:
+            self._thread_pool = ThreadPoolExecutor(max_workers=self.thread_workers)
+        if self.process_workers and self._process_pool is None:
+            self._process_pool = ProcessPoolExecutor(max_workers=self.process_workers)
+            futures = [self._process_pool.submit(_warmUp) for _ in range(self.process_workers)]
+            for future in futures:
+                future.result()
+
+    def shutdown(self):
+        """关闭线程池与进程池"""
+        if self._thread_pool is not None:
+            self._thread_pool.shutdown(wait=False, cancel_futures=True)
+            self._thread_pool = None
+        if self._process_pool is not None:
+            self._process_pool.shutdown(wait=False, cancel_futures=True)
+            self._process_pool = None
+
+    def _semaphore(self, func_name: str, max_concurrency: int):
+        """按函数获取并发控制信号量"""
+        semaphore = self._semaphores.get(func_name)
+        if semaphore is None or semaphore.limit != max_concurrency:
+            semaphore = asyncio.Semaphore(max_concurrency)
+            semaphore.limit = max_concurrency
+            self._semaphores[func_name] = semaphore
+        return semaphore
+
+    def _submit(self, func_name: str, params: dict, backend: str):
+        """提交到对应的执行后端，返回可 await 的对象"""
+        func = func_registry.get_func(func_name)
+        if inspect.iscoroutinefunction(func):
+            return func(**params)
+
+        loop = asyncio.get_running_loop()
+        if self._thread_pool is None or (backend == "process" and self._process_pool is None):
+            self.start()
+        if backend == "process":
+            return loop.run_in_executor(self._process_pool, _runInProcess,
+                                        func_name, Config.register_funCode[func_name], params)
+        return loop.run_in_executor(self._thread_pool, partial(func, **params))
+
+    async def run(self, func_name: str, params: dict):
+        """
+        执行已注册的函数
+        :param func_name: 函数名称
+        :param params: 函数参数
+        :return:
+        """
+        option = Config.register_funOption.get(func_name, {})
+        backend = option.get("backend", "thread")
+        timeout = option.get("timeout")
+        max_concurrency = option.get("max_concurrency")
+
+        with metrics.timer("tool_call_seconds", func=func_name, backend=backend):
+            if not max_concurrency:
+                return await asyncio.wait_for(self._submit(func_name, params, backend), timeout)
+
+            return await self._runLimited(func_name, params, backend, timeout, max_concurrency)
+
+    async def _runLimited(self, func_name: str, params: dict, backend: str, timeout, max_concurrency: int):
+        """
+        带并发上限的执行；超时只停止等待，线程或子进程中的调用仍在运行，
+        信号量要等调用真正结束后才释放，避免超时的慢调用继续占满执行池
+        """
+        semaphore = self._semaphore(func_name, max_concurrency)
+        await semaphore.acquire()
+        try:
+            awaitable = self._submit(func_name, params, backend)
+        except BaseException:
+            semaphore.release()
+            raise
+
+        def release(future):
+            semaphore.release()
+            if not future.cancelled():
+                future.exception()  # 超时后无人等待的调用，取出异常避免告警
+
+        is_coroutine = asyncio.iscoroutine(awaitable)
+        future = asyncio.ensure_future(awaitable)
+        future.add_done_callback(release)
+        if is_coroutine:
+            # async def 函数超时后随任务取消，取消完成即释放
+            return await asyncio.wait_for(future, timeout)
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+func_executor = FuncExecutor()
@@ -0,0 +1,221 @@
+"""
+持久化的函数注册表：源码、哈希、函数信息与执行配置保存到 sqlite，重启后按需恢复；
+同一台机器上的多个 uvicorn worker 共享同一个数据库文件，通过版本号同步各自的内存缓存
+"""
+from Interface.Utils.config import Config
+from Utils.funcCache import cache_func
+from typing import Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class FuncRegistry:
+    """
+    函数注册表
+    启动时只加载函数信息，函数对象在第一次调用时才编译；编译结果按源码哈希缓存，相同源码重复注册时不再编译。
+    每次注册都会增加版本号，其他 worker 发现版本号变化后才重新读取注册信息，平时只读内存
+    """
+
+    def __init__(self, db_path: str = None, refresh_interval: float = None):
+        """
+        :param db_path: 注册表数据库路径，默认使用 Config.registry_path
+        :param refresh_interval: 检查版本号的最小间隔(秒)，本地找不到函数时会立即检查
+        """
+        self.db_path = db_path
+        self.refresh_interval = Config.registry_refresh_interval if refresh_interval is None else refresh_interval
+        self._codes = {}
+        self._hashes = {}
+        self._known = {}
+        self._version = None
+        self._checked = 0.0
+        self._lock = threading.RLock()
+        # 第一次使用时才打开数据库，导入模块时不创建文件
+        self._conn = None
+
+    def _connection(self) -> sqlite3.Connection:
+        """打开注册表数据库并建表，已打开时直接返回"""
+        with self._lock:
+            if self._conn is not None:
+                return self._conn
+            self.db_path = self.db_path or Config.registry_path
+            conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS funcs (
+                    func_name TEXT PRIMARY KEY,
+                    func_code TEXT,
+                    code_hash TEXT,
+                    func_info TEXT,
+                    options TEXT,
+                    updated REAL
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(funcs)")}
+            if "func_schema" not in columns:
+                conn.execute("ALTER TABLE funcs ADD COLUMN func_schema TEXT")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0)")
+            conn.commit()
+            self._conn = conn
+            return conn
+
+    @staticmethod
+    def _hash(func_code: str) -> str:
+        return hashlib.sha256(func_code.encode("utf-8")).hexdigest()
+
+    def _compile(self, func_name: str, func_code: str, code_hash: str):
+        """
+        编译源码并取出同名函数，编译结果按源码哈希缓存
+        :return:
+        """
+        code = self._codes.get(code_hash)
+        if code is None:
+            code = compile(func_code, f"<func {func_name}>", "exec")
+            self._codes[code_hash] = code
+
+        # 执行源码，产生命名空间
+        namespace: dict = {}
+        exec(code, namespace)
+
+        if func_name not in namespace:
+            raise ValueError(f"源码中找不到函数 {func_name}")
+        return namespace[func_name]
+
+    def _build(self, func_name: str, func_code: str, code_hash: str, options: dict):
+        """生成可调用的函数对象，并放入内存注册表"""
+        func = self._compile(func_name, func_code, code_hash)
+        if options.get("cache"):
+            func = cache_func(func, options.get("cache_ttl", 60), options.get("cache_maxsize", 128))
+
+        Config.register_funObject[func_name] = func
+        Config.register_funCode[func_name] = func_code
+        self._hashes[func_name] = code_hash
+        return func
+
+    @staticmethod
+    def _setSchema(func_name: str, func_schema: Optional[dict]):
+        """更新内存中的工具描述，旧客户端注册的函数没有描述"""
+        if func_schema:
+            Config.register_funSchema[func_name] = func_schema
+        else:
+            Config.register_funSchema.pop(func_name, None)
+
+    def register(self, func_name: str, func_code: str, func_info: str, options: dict = None,
+                 func_schema: dict = None) -> bool:
+        """
+        注册函数，源码与配置都没有变化时跳过编译
+        :param func_name: 函数名称
+        :param func_code: 函数源码
+        :param func_info: 函数信息
+        :param options: 执行与缓存配置
+        :param func_schema: JSON 工具描述
+        :return: 是否重新编译了函数
+        """
+        options = options or {}
+        code_hash = self._hash(func_code)
+        with self._lock:
+            unchanged = (self._hashes.get(func_name) == code_hash and
+                         Config.register_funOption.get(func_name) == options and
+                         func_name in Config.register_funObject)
+            if not unchanged:
+                self._build(func_name, func_code, code_hash, options)
+
+            Config.register_funDoc[func_name] = func_info
+            Config.register_funOption[func_name] = options
+            self._setSchema(func_name, func_schema)
+            Config.tool_index.add(func_name, func_info)
+            self._known[func_name] = (code_hash, options)
+
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO funcs
+                    (func_name, func_code, code_hash, func_info, options, func_schema, updated)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)""",
+                    (func_name, func_code, code_hash, func_info, json.dumps(options),
+                     json.dumps(func_schema) if func_schema else None, time.time())
+                )
+                conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+                version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+            # 期间没有其他 worker 写入时，本地缓存已是最新
+            if self._version == version - 1:
+                self._version = version
+        return not unchanged
+
+    def load(self):
+        """启动时加载全部函数信息，函数对象延迟到第一次调用时编译"""
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        """
+        版本号变化时重新读取函数信息，源码或配置有变化的函数在下次调用时重新编译
+        :param force: 是否忽略检查间隔立即检查
+        """
+        now = time.monotonic()
+        if not force and now - self._checked < self.refresh_interval:
+            return
+
+        with self._lock:
+            self._checked = now
+            conn = self._connection()
+            version = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+            if version == self._version:
+                return
+
+            rows = conn.execute(
+                "SELECT func_name, func_info, code_hash, options, func_schema FROM funcs"
+            ).fetchall()
+            known = {}
+            for func_name, func_info, code_hash, options, func_schema in rows:
+                options = json.loads(options) if options else {}
+                known[func_name] = (code_hash, options)
+                Config.register_funDoc[func_name] = func_info
+                Config.register_funOption[func_name] = options
+                self._setSchema(func_name, json.loads(func_schema) if func_schema else None)
+                if self._known.get(func_name) != (code_hash, options):
+                    Config.register_funObject.pop(func_name, None)
+
+            for func_name in set(self._known) - set(known):
+                Config.register_funDoc.pop(func_name, None)
+                Config.register_funOption.pop(func_name, None)
+                Config.register_funObject.pop(func_name, None)
+                Config.register_funSchema.pop(func_name, None)
+
+            Config.tool_index.sync(Config.register_funDoc)
+            self._known = known
+            self._version = version
+
+    def get_func(self, func_name: str) -> Optional[callable]:
+        """
+        获取函数对象，未编译时从注册表中读取源码并编译
+        :param func_name: 函数名称
+        :return: 未注册时返回 None
+        """
+        self.refresh()
+        func = Config.register_funObject.get(func_name)
+        if func is not None:
+            return func
+
+        # 本地没有时可能是其他 worker 刚注册的函数
+        self.refresh(force=True)
+        with self._lock:
+            func = Config.register_funObject.get(func_name)
+            if func is not None:
+                return func
+
+            row = self._connection().execute(
+                "SELECT func_code, code_hash, options FROM funcs WHERE func_name = ?", (func_name,)
+            ).fetchone()
+            if row is None:
+                return None
+            func_code, code_hash, options = row
+            return self._build(func_name, func_code, code_hash, json.loads(options) if options else {})
+
+
+func_registry = FuncRegistry()
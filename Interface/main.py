@@ -1,26 +1,80 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
+from contextlib import asynccontextmanager
+import time
 import uvicorn
 from Interface.Utils.config import Config
+from Interface.Utils.funcExecutor import func_executor
+from Interface.Utils.funcRegistry import func_registry
 from Interface.Router.excuterRouter import excuter_router
 from Interface.Router.registerRouter import register_router
+from Interface.Router.agentRouter import agent_router
+from Utils.metrics import metrics
 
-app = FastAPI(title="FuncTools 工具中心")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时恢复已注册的函数信息并预热进程池，关闭时释放执行资源
+    func_registry.load()
+    func_executor.start()
+    yield
+    func_executor.shutdown()
+
+
+app = FastAPI(title="FuncTools 工具中心", lifespan=lifespan)
 
 app.include_router(excuter_router)
 app.include_router(register_router)
+app.include_router(agent_router)
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    """
+    记录各接口的耗时与请求数
+    """
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.observe("http_request_seconds", time.perf_counter() - start, route=path)
+        metrics.inc("http_requests_total", route=path, status=status)
+
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Prometheus 格式的指标
+    :return:
+    """
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 @app.get("/list")
-def list_funcs():
+def list_funcs(query: str = None, k: int = 5):
     """
     返回已经注册的工具信息
+    :param query: 用户输入，提供时只返回最相关的 k 个工具，命中不足时按注册顺序补足
+    :param k: 返回的工具个数
     :return:
     """
+    func_registry.refresh()
+    if query:
+        names = Config.tool_index.search(query, k, fill=True)
+    else:
+        names = list(Config.register_funDoc)
     functools = []
-    for k,v in Config.register_funDoc.items():
+    for k,v in ((name, Config.register_funDoc[name]) for name in names if name in Config.register_funDoc):
         cur_dict = {
             "func_name": k,
             "func_info": v,
         }
+        if k in Config.register_funSchema:
+            cur_dict["func_schema"] = Config.register_funSchema[k]
         functools.append(cur_dict)
 
     return {"funcs": functools}
@@ -0,0 +1,196 @@
+"""
+模型调用结果缓存，包装任意 BasicModel 子类，相同的模型、地址与消息直接返回已缓存的回复
+"""
+from Core.basicModel import BasicModel
+from Utils.lruCache import LRUCache
+from typing import Optional
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+
+
+class CacheModel(BasicModel, register=False):
+    """
+    两级缓存：内存 LRU + 可选的 SQLite 磁盘缓存
+    """
+
+    # 磁盘缓存每写入多少条检查一次容量
+    _prune_interval = 64
+
+    def __init__(self, model: BasicModel, maxsize: int = 1024, ttl: Optional[float] = None,
+                 db_path: Optional[str] = None, disk_maxsize: int = 100000, disk_ttl: Optional[float] = None):
+        """
+        :param model: 被包装的模型
+        :param maxsize: 内存缓存最大条数
+        :param ttl: 内存缓存过期时间(秒)
+        :param db_path: 磁盘缓存数据库路径，为 None 时只使用内存缓存
+        :param disk_maxsize: 磁盘缓存最大条数
+        :param disk_ttl: 磁盘缓存过期时间(秒)
+        """
+        super().__init__(model.model_name, model.model_url, model.api_key)
+        self.model = model
+        self.memory = LRUCache(maxsize, ttl)
+        self.db_path = db_path
+        self.disk_maxsize = disk_maxsize
+        self.disk_ttl = disk_ttl
+        self.disk_hits = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = None
+        if db_path is not None:
+            self._conn = sqlite3.connect(db_path, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT,
+                    created REAL,
+                    accessed REAL
+                )"""
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache (accessed)")
+            self._conn.commit()
+
+    def _key(self, messages, tools: Optional[list] = None) -> str:
+        """
+        根据模型名称、地址与规范化后的消息生成缓存键
+        :param tools: 原生函数调用的工具描述，非 None 时一并计入，与普通调用的缓存互不混用
+        """
+        payload = [self.model_name, self.model_url, self._formatMessages(messages)]
+        if tools is not None:
+            payload.append({"tools": tools})
+        payload = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _diskGet(self, key: str):
+        """读取磁盘缓存"""
+        if self._conn is None:
+            return None
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM llm_cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            response, created = row
+            if self.disk_ttl is not None and created + self.disk_ttl < now:
+                self._conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE llm_cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        return response
+
+    def _diskSet(self, key: str, response: str):
+        """写入磁盘缓存，定期按最近访问时间淘汰超出容量的条目"""
+        if self._conn is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, response, created, accessed) VALUES (?, ?, ?, ?)",
+                (key, response, now, now)
+            )
+            self._writes += 1
+            if self._writes % self._prune_interval == 0:
+                if self.disk_ttl is not None:
+                    self._conn.execute("DELETE FROM llm_cache WHERE created < ?", (now - self.disk_ttl,))
+                self._conn.execute(
+                    "DELETE FROM llm_cache WHERE key IN "
+                    "(SELECT key FROM llm_cache ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+                    (self.disk_maxsize,)
+                )
+            self._conn.commit()
+
+    def _lookup(self, key: str):
+        """依次查找内存与磁盘缓存，磁盘命中后回填内存"""
+        response = self.memory.get(key)
+        if response is not None:
+            return response
+        response = self._diskGet(key)
+        if response is not None:
+            self.disk_hits += 1
+            self.memory.set(key, response)
+        return response
+
+    def _save(self, key: str, response):
+        if response is None:
+            return
+        self.memory.set(key, response)
+        self._diskSet(key, response)
+
+    def invoke(self, *args, **kwargs):
+        """
+        :param cache: 为 False 时不读取缓存，直接调用模型并用新结果覆盖缓存，
+                      用于调用方拒绝了已缓存的回复(如格式错误)后重试
+        """
+        key = self._key(kwargs.get("messages", ""))
+        response = self._lookup(key) if kwargs.get("cache", True) else None
+        if response is not None:
+            return response
+
+        response = self.model.invoke(*args, **kwargs)
+        self._save(key, response)
+        return response
+
+    async def ainvoke(self, *args, **kwargs):
+        key = self._key(kwargs.get("messages", ""))
+        response = self._lookup(key) if kwargs.get("cache", True) else None
+        if response is not None:
+            return response
+
+        response = await self.model.ainvoke(*args, **kwargs)
+        self._save(key, response)
+        return response
+
+    def invoke_tools(self, *args, **kwargs):
+        """原生函数调用，结果字典以 JSON 文本缓存，每次命中返回新的字典；cache 参数与 invoke 相同"""
+        key = self._key(kwargs.get("messages", ""), kwargs.get("tools") or [])
+        response = self._lookup(key) if kwargs.get("cache", True) else None
+        if response is not None:
+            return json.loads(response)
+
+        result = self.model.invoke_tools(*args, **kwargs)
+        if result.get("status", True):
+            # 参数无法解析的结果不缓存
+            self._save(key, json.dumps(result, ensure_ascii=False))
+        return result
+
+    async def ainvoke_tools(self, *args, **kwargs):
+        key = self._key(kwargs.get("messages", ""), kwargs.get("tools") or [])
+        response = self._lookup(key) if kwargs.get("cache", True) else None
+        if response is not None:
+            return json.loads(response)
+
+        result = await self.model.ainvoke_tools(*args, **kwargs)
+        if result.get("status", True):
+            # 参数无法解析的结果不缓存
+            self._save(key, json.dumps(result, ensure_ascii=False))
+        return result
+
+    def stats(self) -> dict:
+        """缓存命中统计，misses 为两级缓存均未命中的次数"""
+        memory = self.memory.stats()
+        return {
+            "memory_hits": memory["hits"],
+            "disk_hits": self.disk_hits,
+            "misses": memory["misses"] - self.disk_hits,
+            "evictions": memory["evictions"],
+            "size": memory["size"],
+        }
+
+    def clear(self):
+        """清空两级缓存"""
+        self.memory.clear()
+        if self._conn is not None:
+            with self._lock:
+                self._conn.execute("DELETE FROM llm_cache")
+                self._conn.commit()
+
+    def close(self):
+        """关闭磁盘缓存连接"""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
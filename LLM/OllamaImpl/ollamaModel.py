@@ -1,35 +1,42 @@
 from abc import ABC
 from Core.basicModel import BasicModel
+from LLM.clientPool import client_pool
+from Agent.funcParser import parse_arguments
+import asyncio
 import ollama
 
 
 class OllamaModel(BasicModel, ABC):
     def __init__(self, model_name, model_url, api_key):
         super().__init__(model_name, model_url, api_key)
-        self._model = ollama.Client(
-            host=model_url
-        )
+        # 相同地址的模型共享客户端，复用长连接
+        self._model = client_pool.get("ollama", self.model_url, self.api_key, lambda: ollama.Client(
+            host=self.model_url,
+            limits=client_pool.limits(),
+        ))
+
+    @property
+    def _async_model(self) -> ollama.AsyncClient:
+        return client_pool.aget("ollama", self.model_url, self.api_key, lambda: ollama.AsyncClient(
+            host=self.model_url,
+            limits=client_pool.limits(),
+        ))
 
     def invoke(self, *args, **kwargs):
-        inputs = kwargs.get("messages", "")
-        if isinstance(inputs, str):
-            inputs = [
-                {
-                    "role": "user",
-                    "content": inputs
-                }
-            ]
+        inputs = self._formatMessages(kwargs.get("messages", ""))
 
-        elif isinstance(inputs, dict):
-            inputs = [inputs]
+        response = self._model.chat(
+            model=self.model_name,
+            messages=inputs,
+            stream=False
+        )
 
-        elif isinstance(inputs, list):
-            inputs = inputs
+        return response['message']['content']
 
-        else:
-            raise ValueError("Invalid inputs, only str or dict or list")
+    async def ainvoke(self, *args, **kwargs):
+        inputs = self._formatMessages(kwargs.get("messages", ""))
 
-        response = ollama.chat(
+        response = await self._async_model.chat(
             model=self.model_name,
             messages=inputs,
             stream=False
@@ -37,3 +44,85 @@ class OllamaModel(BasicModel, ABC):
 
         return response['message']['content']
 
+    @staticmethod
+    def _toolResult(message) -> dict:
+        """从回复的 tool_calls 字段中读取函数调用，ollama 的参数通常已是字典，为文本时按 JSON 解析"""
+        status = True
+        func_tools = []
+        for call in message.get('tool_calls') or []:
+            ok, params = parse_arguments(call['function']['arguments'])
+            status = status and ok
+            func_tools.append({"func": call['function']['name'], "params": params})
+        return {"content": message['content'] or "", "func_tools": func_tools, "status": status}
+
+    def invoke_tools(self, *args, **kwargs):
+        inputs = self._formatMessages(kwargs.get("messages", ""))
+
+        response = self._model.chat(
+            model=self.model_name,
+            messages=inputs,
+            tools=kwargs.get("tools") or None,
+            stream=False
+        )
+
+        return self._toolResult(response['message'])
+
+    async def ainvoke_tools(self, *args, **kwargs):
+        inputs = self._formatMessages(kwargs.get("messages", ""))
+
+        response = await self._async_model.chat(
+            model=self.model_name,
+            messages=inputs,
+            tools=kwargs.get("tools") or None,
+            stream=False
+        )
+
+        return self._toolResult(response['message'])
+
+    def stream_invoke(self, *args, **kwargs):
+        inputs = self._formatMessages(kwargs.get("messages", ""))
+
+        response = self._model.chat(
+            model=self.model_name,
+            messages=inputs,
+            stream=True
+        )
+
+        # 调用方提前结束迭代时关闭连接，不再接收剩余 token
+        try:
+            for part in response:
+                if part['message']['content']:
+                    yield part['message']['content']
+        finally:
+            response.close()
+
+    async def astream_invoke(self, *args, **kwargs):
+        inputs = self._formatMessages(kwargs.get("messages", ""))
+
+        response = await self._async_model.chat(
+            model=self.model_name,
+            messages=inputs,
+            stream=True
+        )
+
+        try:
+            async for part in response:
+                if part['message']['content']:
+                    yield part['message']['content']
+        finally:
+            await response.aclose()
+
+    def batch_invoke(self, list_of_messages: list, max_concurrency: int = 8):
+        # 已在事件循环中时无法再启动新的循环，退回线程池实现
+        if self._inEventLoop():
+            return super().batch_invoke(list_of_messages, max_concurrency)
+
+        # 使用异步客户端在一个事件循环中并发请求，不为每个请求占用线程
+        async def run():
+            try:
+                return await self.abatch_invoke(list_of_messages, max_concurrency)
+            finally:
+                await client_pool.aclose()
+
+        return asyncio.run(run())
+
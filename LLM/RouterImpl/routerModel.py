@@ -0,0 +1,363 @@
+"""
+多个模型后端之间的路由：按实时延迟与错误率选择后端，支持对冲请求、熔断与失败转移
+"""
+from Core.basicModel import BasicModel
+from Utils.metrics import metrics
+from Utils.modelEnum import ModelEnum
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import List, Optional
+import asyncio
+import threading
+import time
+
+
+class _Backend:
+    """单个后端的实时状态"""
+
+    def __init__(self, model: BasicModel):
+        self.model = model
+        self.name = f"{model.model_name}@{model.model_url}"
+        self.latency = None     # 成功请求耗时的指数加权平均(秒)
+        self.error_rate = 0.0   # 错误率的指数加权平均
+        self.outstanding = 0    # 正在进行的请求数
+        self.failures = 0       # 连续失败次数
+        self.opened_at = None   # 熔断开始时间，为 None 时未熔断
+        self.probing = False    # 熔断恢复期是否已有试探请求
+
+
+class RouterModel(BasicModel, register=False):
+    """
+    模型路由
+    每次选择 延迟EWMA × (进行中请求数 + 1) × (1 + 错误率惩罚) 最小的后端；
+    主请求超过对冲等待时间仍未返回时，向另一个后端发出相同请求，先返回的结果生效；
+    后端连续失败达到阈值后熔断，冷却后放行一个试探请求，成功则恢复
+    """
+
+    # 错误率在评分中的惩罚系数
+    _error_penalty = 4.0
+
+    def __init__(self, models: List[BasicModel], alpha: float = 0.3, hedge: bool = True,
+                 hedge_after: Optional[float] = None, hedge_factor: float = 2.0, max_attempts: Optional[int] = None,
+                 failure_threshold: int = 3, reset_timeout: float = 30.0, max_workers: int = 64):
+        """
+        :param models: 后端模型列表，通常是同一模型部署在多个地址上
+        :param alpha: 延迟与错误率指数加权平均的系数，越大越偏向最近的请求
+        :param hedge: 是否发出对冲请求
+        :param hedge_after: 对冲等待时间(秒)，为 None 时使用所选后端延迟 EWMA 的 hedge_factor 倍
+        :param hedge_factor: 自适应对冲等待时间的倍数
+        :param max_attempts: 单次调用最多使用的后端数(含对冲与失败转移)，默认为后端总数
+        :param failure_threshold: 连续失败多少次后熔断
+        :param reset_timeout: 熔断冷却时间(秒)
+        :param max_workers: 同步调用使用的线程池大小
+        """
+        if not models:
+            raise ValueError("至少需要一个模型后端")
+        first = models[0]
+        super().__init__(first.model_name, ",".join(str(m.model_url) for m in models), first.api_key)
+        self.backends = [_Backend(model) for model in models]
+        self.alpha = alpha
+        self.hedge = hedge
+        self.hedge_after = hedge_after
+        self.hedge_factor = hedge_factor
+        self.max_attempts = max_attempts or len(models)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+        self._pool = None
+
+    @classmethod
+    def fromUrls(cls, class_name: ModelEnum, model_name: str, model_urls: List[str], api_key: str = None,
+                 **kwargs) -> "RouterModel":
+        """
+        为同一模型的多个地址创建路由
+        :param class_name: 模型枚举
+        :param model_name: 模型名称
+        :param model_urls: 后端地址列表
+        :param api_key: api_key
+        :param kwargs: RouterModel 的其他参数
+        :return:
+        """
+        models = [BasicModel.createModel(class_name=class_name, model_name=model_name, model_url=url,
+                                         api_key=api_key)
+                  for url in model_urls]
+        return cls(models, **kwargs)
+
+    def _prior(self) -> float:
+        """没有延迟样本的后端使用的先验延迟：已有样本的平均值，全部没有样本时为 1 秒"""
+        sampled = [backend.latency for backend in self.backends if backend.latency is not None]
+        return sum(sampled) / len(sampled) if sampled else 1.0
+
+    def _score(self, backend: _Backend, prior: float) -> float:
+        """后端评分，越小越优先；没有延迟样本的后端按先验延迟计算，进行中请求数与错误率同样生效"""
+        latency = backend.latency if backend.latency is not None else prior
+        return latency * (backend.outstanding + 1) * (1 + backend.error_rate * self._error_penalty)
+
+    def _pick(self, tried: list) -> Optional[_Backend]:
+        """
+        选择一个本次调用未使用过的后端，并计入进行中请求数
+        :param tried: 本次调用已使用的后端
+        :return: 没有可用后端时返回 None
+        """
+        now = time.monotonic()
+        with self._lock:
+            candidates = []
+            for backend in self.backends:
+                if backend in tried:
+                    continue
+                if backend.opened_at is None:
+                    candidates.append(backend)
+                elif not backend.probing and now - backend.opened_at >= self.reset_timeout:
+                    candidates.append(backend)
+
+            if not candidates and not tried:
+                # 全部熔断时，提前试探熔断最久的后端，不直接失败
+                waiting = [b for b in self.backends if not b.probing]
+                if waiting:
+                    candidates = [min(waiting, key=lambda b: b.opened_at)]
+            if not candidates:
+                return None
+
+            prior = self._prior()
+            backend = min(candidates, key=lambda b: self._score(b, prior))
+            if backend.opened_at is not None:
+                backend.probing = True
+            backend.outstanding += 1
+            tried.append(backend)
+            return backend
+
+    def _record(self, backend: _Backend, duration: float, error: Optional[Exception]):
+        """记录一次请求结果，更新延迟、错误率与熔断状态"""
+        with self._lock:
+            backend.outstanding -= 1
+            backend.error_rate += self.alpha * ((error is not None) - backend.error_rate)
+            if error is None:
+                backend.latency = duration if backend.latency is None else \
+                    backend.latency + self.alpha * (duration - backend.latency)
+                backend.failures = 0
+                backend.opened_at = None
+                backend.probing = False
+            else:
+                backend.failures += 1
+                if backend.probing or backend.failures >= self.failure_threshold:
+                    if backend.opened_at is None or backend.probing:
+                        print(f"模型后端 {backend.name} 熔断：{error}")
+                    backend.opened_at = time.monotonic()
+                    backend.probing = False
+        metrics.inc("model_backend_requests_total", backend=backend.name, status="error" if error else "ok")
+        if error is None:
+            metrics.observe("model_backend_seconds", duration, backend=backend.name)
+
+    def _hedgeDelay(self, backend: _Backend) -> Optional[float]:
+        """对冲等待时间，不对冲或没有延迟样本时返回 None"""
+        if not self.hedge:
+            return None
+        if self.hedge_after is not None:
+            return self.hedge_after
+        if backend.latency is None:
+            return None
+        return backend.latency * self.hedge_factor
+
+    def _call(self, backend: _Backend, method: str, args, kwargs):
+        """在线程池中调用后端"""
+        start = time.perf_counter()
+        try:
+            result = getattr(backend.model, method)(*args, **kwargs)
+        except Exception as e:
+            self._record(backend, time.perf_counter() - start, e)
+            raise
+        self._record(backend, time.perf_counter() - start, None)
+        return result
+
+    async def _acall(self, backend: _Backend, method: str, args, kwargs):
+        """异步调用后端，被取消的对冲请求不计入错误"""
+        start = time.perf_counter()
+        try:
+            result = await getattr(backend.model, method)(*args, **kwargs)
+        except asyncio.CancelledError:
+            with self._lock:
+                backend.outstanding -= 1
+                backend.probing = False
+            raise
+        except Exception as e:
+            self._record(backend, time.perf_counter() - start, e)
+            raise
+        self._record(backend, time.perf_counter() - start, None)
+        return result
+
+    def _getPool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._pool
+
+    def _route(self, method: str, args, kwargs):
+        """
+        同步路由：主请求 + 对冲请求 + 失败转移，返回最先成功的结果
+        未完成的对冲请求在后台结束，其耗时仍计入后端统计
+        """
+        pool = self._getPool()
+        tried, errors, pending = [], [], {}
+
+        def submit():
+            backend = self._pick(tried)
+            if backend is not None:
+                pending[pool.submit(self._call, backend, method, args, kwargs)] = backend
+            return backend
+
+        if submit() is None:
+            raise RuntimeError("没有可用的模型后端")
+
+        hedging = True
+        while pending:
+            primary = next(iter(pending.values()))
+            delay = self._hedgeDelay(primary) if hedging and len(tried) < self.max_attempts else None
+            done, _ = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            if not done:
+                # 超过对冲等待时间仍未返回，没有可对冲的后端时之后只等待已发出的请求
+                if submit() is not None:
+                    metrics.inc("model_hedged_requests_total")
+                else:
+                    hedging = False
+                continue
+
+            for future in done:
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as e:
+                    errors.append(f"{backend.name}: {type(e).__name__}: {e}")
+
+            # 失败转移到下一个后端
+            if not pending and len(tried) < self.max_attempts:
+                submit()
+
+        raise RuntimeError(f"全部模型后端调用失败：{errors}")
+
+    async def _aroute(self, method: str, args, kwargs):
+        """异步路由，先返回的结果生效后取消其余请求"""
+        tried, errors, pending = [], [], {}
+
+        def submit():
+            backend = self._pick(tried)
+            if backend is not None:
+                pending[asyncio.ensure_future(self._acall(backend, method, args, kwargs))] = backend
+            return backend
+
+        if submit() is None:
+            raise RuntimeError("没有可用的模型后端")
+
+        try:
+            hedging = True
+            while pending:
+                primary = next(iter(pending.values()))
+                delay = self._hedgeDelay(primary) if hedging and len(tried) < self.max_attempts else None
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    if submit() is not None:
+                        metrics.inc("model_hedged_requests_total")
+                    else:
+                        hedging = False
+                    continue
+
+                for task in done:
+                    backend = pending.pop(task)
+                    try:
+                        return task.result()
+                    except Exception as e:
+                        errors.append(f"{backend.name}: {type(e).__name__}: {e}")
+
+                if not pending and len(tried) < self.max_attempts:
+                    submit()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise RuntimeError(f"全部模型后端调用失败：{errors}")
+
+    def invoke(self, *args, **kwargs):
+        return self._route("invoke", args, kwargs)
+
+    async def ainvoke(self, *args, **kwargs):
+        return await self._aroute("ainvoke", args, kwargs)
+
+    def invoke_tools(self, *args, **kwargs):
+        return self._route("invoke_tools", args, kwargs)
+
+    async def ainvoke_tools(self, *args, **kwargs):
+        return await self._aroute("ainvoke_tools", args, kwargs)
+
+    def stream_invoke(self, *args, **kwargs):
+        """流式调用不对冲，输出第一段之前失败时转移到下一个后端"""
+        tried, errors = [], []
+        while len(tried) < self.max_attempts:
+            backend = self._pick(tried)
+            if backend is None:
+                break
+            start = time.perf_counter()
+            started = False
+            try:
+                for chunk in backend.model.stream_invoke(*args, **kwargs):
+                    started = True
+                    yield chunk
+            except GeneratorExit:
+                self._record(backend, time.perf_counter() - start, None)
+                raise
+            except Exception as e:
+                self._record(backend, time.perf_counter() - start, e)
+                if started:
+                    raise
+                errors.append(f"{backend.name}: {type(e).__name__}: {e}")
+                continue
+            self._record(backend, time.perf_counter() - start, None)
+            return
+        raise RuntimeError(f"全部模型后端调用失败：{errors}")
+
+    async def astream_invoke(self, *args, **kwargs):
+        """异步流式调用，输出第一段之前失败时转移到下一个后端"""
+        tried, errors = [], []
+        while len(tried) < self.max_attempts:
+            backend = self._pick(tried)
+            if backend is None:
+                break
+            start = time.perf_counter()
+            started = False
+            try:
+                async for chunk in backend.model.astream_invoke(*args, **kwargs):
+                    started = True
+                    yield chunk
+            except (GeneratorExit, asyncio.CancelledError):
+                self._record(backend, time.perf_counter() - start, None)
+                raise
+            except Exception as e:
+                self._record(backend, time.perf_counter() - start, e)
+                if started:
+                    raise
+                errors.append(f"{backend.name}: {type(e).__name__}: {e}")
+                continue
+            self._record(backend, time.perf_counter() - start, None)
+            return
+        raise RuntimeError(f"全部模型后端调用失败：{errors}")
+
+    def stats(self) -> List[dict]:
+        """各后端的实时状态"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "backend": backend.name,
+                    "latency": backend.latency,
+                    "error_rate": backend.error_rate,
+                    "outstanding": backend.outstanding,
+                    "failures": backend.failures,
+                    "open": backend.opened_at is not None and now - backend.opened_at < self.reset_timeout,
+                }
+                for backend in self.backends
+            ]
+
+    def close(self):
+        """关闭同步调用使用的线程池，未完成的对冲请求继续在后台结束"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+            self._pool = None
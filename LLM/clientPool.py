@@ -0,0 +1,103 @@
+"""
+模型客户端连接池，相同 (提供方, 地址, api_key) 的模型共享同一个保持长连接的客户端
+"""
+from typing import Callable, Optional
+import asyncio
+import threading
+import weakref
+import httpx
+
+
+class ClientPool:
+    """
+    客户端池
+    同步客户端在进程内共享；异步客户端绑定事件循环，按事件循环分别缓存
+    """
+
+    def __init__(self, max_connections: int = 100, max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0):
+        """
+        :param max_connections: 每个客户端的最大连接数
+        :param max_keepalive_connections: 每个客户端保持的空闲长连接数
+        :param keepalive_expiry: 空闲长连接的保持时间(秒)
+        """
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def configure(self, max_connections: int = None, max_keepalive_connections: int = None,
+                  keepalive_expiry: float = None):
+        """修改连接限制，只对之后新建的客户端生效"""
+        if max_connections is not None:
+            self.max_connections = max_connections
+        if max_keepalive_connections is not None:
+            self.max_keepalive_connections = max_keepalive_connections
+        if keepalive_expiry is not None:
+            self.keepalive_expiry = keepalive_expiry
+
+    def limits(self) -> httpx.Limits:
+        """新建 HTTP 客户端使用的连接限制"""
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def get(self, provider: str, base_url: Optional[str], api_key: Optional[str], factory: Callable):
+        """
+        获取同步客户端，不存在时调用 factory 创建
+        :param provider: 模型提供方
+        :param base_url: 模型地址
+        :param api_key: api_key
+        :param factory: 创建客户端的函数
+        :return:
+        """
+        key = (provider, base_url, api_key)
+        client = self._clients.get(key)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(key)
+                if client is None:
+                    client = factory()
+                    self._clients[key] = client
+        return client
+
+    def aget(self, provider: str, base_url: Optional[str], api_key: Optional[str], factory: Callable):
+        """
+        获取当前事件循环中的异步客户端，不存在时调用 factory 创建
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        key = (provider, base_url, api_key)
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            client = clients.get(key)
+            if client is None:
+                client = factory()
+                clients[key] = client
+        return client
+
+    async def aclose(self):
+        """关闭并清空当前事件循环中的异步客户端"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.pop(loop, {})
+        for client in clients.values():
+            close = getattr(client, "close", None)
+            if close is not None:
+                await close()
+
+    def close(self):
+        """关闭并清空同步客户端"""
+        with self._lock:
+            for client in self._clients.values():
+                close = getattr(client, "close", None)
+                if close is not None:
+                    close()
+            self._clients.clear()
+
+
+client_pool = ClientPool()
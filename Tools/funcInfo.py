@@ -1,7 +1,9 @@
 from functools import wraps
 from Utils.config import Config
+from Utils.funcCache import cache_func
+from Tools.funcSchema import build_schema
+from Utils.httpSession import get_session
 import inspect
-import requests
 import re
 
 
@@ -10,7 +12,17 @@ class FuncInfo:
     通过此类的方法 将函数注册到全局配置中，为进行函数调用提供函数信息
     """
 
-    def get_funcDoc(self, func):
+    def get_funcDoc(self, func=None, *, cache: bool = False, ttl: float = 60, maxsize: int = 128):
+        """
+        注册函数，可直接作为装饰器使用，也可以带参数使用，如 @get_funcDoc(cache=True, ttl=300)
+        :param func: 被注册的函数
+        :param cache: 是否缓存函数结果，只用于只读函数
+        :param ttl: 缓存过期时间(秒)
+        :param maxsize: 最大缓存条数
+        :return:
+        """
+        if func is None:
+            return lambda f: self.get_funcDoc(f, cache=cache, ttl=ttl, maxsize=maxsize)
 
         # 函数名称
         func_name = func.__name__
@@ -31,10 +43,20 @@ class FuncInfo:
             params.append(f"参数为 {p_name},类型为 {param_type},是否必须: {required},默认值为 {default}")
 
         Config.register_funDoc[func_name] = f"函数 {func_name} 的作用为 {func_doc}," + ";".join(params)
-        Config.register_funObject[func_name] = func
+        Config.register_funSchema[func_name] = build_schema(func)
+        Config.tool_index.add(func_name, Config.register_funDoc[func_name])
+        Config.register_funObject[func_name] = cache_func(func, ttl, maxsize) if cache else func
 
         return func
 
+    def cache_stats(self) -> dict:
+        """
+        已开启缓存的注册函数的命中统计
+        :return:
+        """
+        return {name: func.cache_stats() for name, func in Config.register_funObject.items()
+                if hasattr(func, "cache_stats")}
+
     def source_without_decorators(self, func_code):
         """
         根据 func 的源码，把顶部的 @decorator 行全部删掉。
@@ -46,11 +68,18 @@ class FuncInfo:
         # 2. 截取 def 行及其之后的内容
         return '\n'.join(func_code.splitlines()[def_line_idx:]) + '\n'
 
-    def remote_register(self, url, require_type = "post"):
+    def remote_register(self, url, require_type = "post", cache: bool = False, ttl: float = 60, maxsize: int = 128,
+                        backend: str = "thread", timeout: float = None, max_concurrency: int = None):
         """
         本函数是一个装饰器，将本地函数注册到远程服务中，在远程服务中调用本地函数
         :param url:
         :param require_type:
+        :param cache: 是否在服务端缓存函数结果，只用于只读函数，不能与 process 后端同时使用
+        :param ttl: 缓存过期时间(秒)
+        :param maxsize: 最大缓存条数
+        :param backend: 服务端执行后端，I/O 密集型用 thread，CPU 密集型用 process
+        :param timeout: 服务端单次调用超时时间(秒)
+        :param max_concurrency: 服务端同时执行的最大调用数
         :return:
         """
         def get_local_func(func):
@@ -76,10 +105,17 @@ class FuncInfo:
             func_code = self.source_without_decorators(inspect.getsource(func))
 
             if require_type == "post":
-                response = requests.post(url=url, json={
+                response = get_session().post(url=url, json={
                     "func_name": func_name,
                     "func_code": func_code,
                     "func_info": func_info,
+                    "func_schema": build_schema(func),
+                    "cache": cache,
+                    "cache_ttl": ttl,
+                    "cache_maxsize": maxsize,
+                    "backend": backend,
+                    "timeout": timeout,
+                    "max_concurrency": max_concurrency,
                 })
                 if response.status_code == 200:
                     print(f"本地函数 {func_name} 远程注册成功")
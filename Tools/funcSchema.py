@@ -0,0 +1,84 @@
+"""
+注册函数转换为原生函数调用使用的 JSON 工具描述(OpenAI 与 Ollama 的 tools 参数格式相同)
+"""
+from typing import Union, get_args, get_origin
+import inspect
+
+
+# Python 类型注解对应的 JSON Schema 类型
+_json_types = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    tuple: "array",
+    set: "array",
+    dict: "object",
+}
+
+
+def _jsonType(annotation) -> str:
+    """
+    类型注解转换为 JSON Schema 类型，无法识别时返回 None，不限制类型
+    """
+    if annotation is inspect.Parameter.empty:
+        return None
+    origin = get_origin(annotation)
+    if origin is Union:
+        # Optional[X] 按 X 处理
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        return _jsonType(args[0]) if len(args) == 1 else None
+    return _json_types.get(origin or annotation)
+
+
+def build_schema(func) -> dict:
+    """
+    根据函数签名与文档生成工具描述，只在注册时生成一次
+    :param func: 注册的函数
+    :return: {"type": "function", "function": {"name", "description", "parameters"}}
+    """
+    properties = {}
+    required = []
+    for p_name, p_info in inspect.signature(func).parameters.items():
+        if p_info.kind in (inspect.Parameter.VAR_POSITIONAL, inspect.Parameter.VAR_KEYWORD):
+            continue
+        prop = {}
+        json_type = _jsonType(p_info.annotation)
+        if json_type:
+            prop["type"] = json_type
+        if p_info.default is inspect.Parameter.empty:
+            required.append(p_name)
+        else:
+            prop["default"] = p_info.default
+        properties[p_name] = prop
+
+    return {
+        "type": "function",
+        "function": {
+            "name": func.__name__,
+            "description": (inspect.getdoc(func) or "").strip(),
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": required,
+            },
+        },
+    }
+
+
+def schema_from_info(func_name: str, func_info: str) -> dict:
+    """
+    只有函数信息文本时(如旧版远程服务)生成的工具描述，参数说明保留在 description 中
+    :param func_name: 函数名称
+    :param func_info: 函数信息
+    :return:
+    """
+    return {
+        "type": "function",
+        "function": {
+            "name": func_name,
+            "description": func_info,
+            "parameters": {"type": "object", "properties": {}},
+        },
+    }
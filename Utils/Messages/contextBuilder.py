@@ -0,0 +1,87 @@
+"""
+按 token 预算组织对话历史
+"""
+from Utils.config import Config
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+from Utils.Messages.tokenCounter import estimate_tokens
+
+
+class ContextBuilder:
+    """
+    对话历史构建器
+    从最新的消息开始向前装入，直到用完 token 预算；单条超长的消息(通常是工具结果)只保留首尾部分。
+    开启召回时，预留四分之一的预算放入更早的、与本次输入相关的消息
+    """
+
+    def __init__(self, message_store: MemorySystem, max_tokens: int = None, max_message_tokens: int = None,
+                 max_messages: int = 50, recall_k: int = None):
+        """
+        :param message_store: 消息存储
+        :param max_tokens: 对话历史的 token 预算
+        :param max_message_tokens: 单条消息的 token 上限，超出时截断
+        :param max_messages: 最多读取的消息条数
+        :param recall_k: 按相关度召回的早期消息条数，默认使用 Config.context_recall_k
+        """
+        self.message_store = message_store
+        self.max_tokens = max_tokens or Config.context_max_tokens
+        self.max_message_tokens = max_message_tokens or Config.context_max_message_tokens
+        self.max_messages = max_messages
+        self.recall_k = Config.context_recall_k if recall_k is None else recall_k
+
+    def _truncate(self, content: str, tokens: int) -> str:
+        """
+        截断超长内容，保留开头与结尾
+        :param content: 消息内容
+        :param tokens: 消息的 token 数
+        :return:
+        """
+        keep = max(1, int(len(content) * self.max_message_tokens / tokens))
+        head = keep * 2 // 3
+        tail = keep - head
+        return f"{content[:head]}...[已截断 {len(content) - keep} 字符]...{content[len(content) - tail:]}"
+
+    def _format(self, msg, tokens: int):
+        """
+        单条消息转换为历史文本
+        :return: 文本及其 token 数
+        """
+        content = msg.content or ""
+        if tokens > self.max_message_tokens:
+            content = self._truncate(content, tokens)
+            tokens = estimate_tokens(content)
+        return f"{msg.role}: {content}", tokens + estimate_tokens(f"{msg.role}: ")
+
+    def build(self, session_id: str, query: str = None) -> str:
+        """
+        组织对话历史
+        :param session_id: 用户对话唯一标识
+        :param query: 本次用户输入，开启召回时用于检索相关的早期消息
+        :return: 按时间顺序排列的对话历史文本
+        """
+        recall = bool(query and self.recall_k)
+        budget = self.max_tokens - self.max_tokens // 4 if recall else self.max_tokens
+
+        lines = []
+        used = 0
+        for msg, tokens in self.message_store.get_recent_with_tokens(session_id, self.max_messages):
+            line, tokens = self._format(msg, tokens)
+            if used + tokens > budget:
+                break
+            lines.append(line)
+            used += tokens
+
+        history = "\n".join(reversed(lines))
+        if not recall:
+            return history
+
+        recalled = []
+        for msg in self.message_store.search_context(session_id, query, self.recall_k, exclude_recent=len(lines)):
+            line, tokens = self._format(msg, estimate_tokens(msg.content or ""))
+            if used + tokens > self.max_tokens:
+                continue
+            recalled.append(line)
+            used += tokens
+
+        if not recalled:
+            return history
+        return "相关的早期对话：\n" + "\n".join(recalled) + "\n最近的对话：\n" + history
@@ -0,0 +1,250 @@
+"""
+对话历史存储维护：保留策略、压缩历史数据、归档冷会话与增量 vacuum
+可以定时执行：python -m Utils.Messages.messageStorage.memoryMaintenance --db agent_memory.db
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from Utils.config import Config
+from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+
+
+class MemoryMaintenance:
+    """
+    对话历史维护
+    删除与归档都会同步 conversations_fts 全文索引；未指定的策略使用 Config 中 memory_ 开头的配置
+    """
+
+    # 每批处理的行数，避免长时间持有写锁
+    batch_size = 500
+
+    def __init__(self, memory: MemorySystem):
+        """
+        :param memory: 需要维护的对话历史存储
+        """
+        self.memory = memory
+
+    def _delete(self, conn, id_query: str, params: tuple = ()) -> int:
+        """
+        删除 id_query 选出的消息及其全文索引
+        :param id_query: 返回 conversations.id 的查询语句
+        :return: 删除的行数
+        """
+        self.memory.delete_fts(conn, id_query, params)
+        return conn.execute(f"DELETE FROM conversations WHERE id IN ({id_query})", params).rowcount
+
+    def apply_retention(self, max_session_messages: Optional[int] = None, max_age_days: Optional[float] = None,
+                        max_total_messages: Optional[int] = None) -> Dict[str, int]:
+        """
+        按保留策略删除旧消息
+        :param max_session_messages: 每个会话只保留最新的若干条消息
+        :param max_age_days: 删除早于该天数的消息
+        :param max_total_messages: 全库只保留最新的若干条消息
+        :return: 各策略删除的行数
+        """
+        max_session_messages = max_session_messages or Config.memory_max_session_messages
+        max_age_days = max_age_days or Config.memory_max_age_days
+        max_total_messages = max_total_messages or Config.memory_max_total_messages
+
+        deleted = {"session": 0, "age": 0, "total": 0}
+        with self.memory._connection() as conn:
+            with conn:
+                if max_session_messages:
+                    deleted["session"] = self._delete(conn, """
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (
+                                PARTITION BY session_id ORDER BY timestamp DESC, id DESC
+                            ) AS rank
+                            FROM conversations
+                        )
+                        WHERE rank > ?
+                    """, (max_session_messages,))
+                if max_age_days:
+                    cutoff = (datetime.now() - timedelta(days=max_age_days)).isoformat()
+                    deleted["age"] = self._delete(conn, "SELECT id FROM conversations WHERE timestamp < ?", (cutoff,))
+                if max_total_messages:
+                    deleted["total"] = self._delete(conn, """
+                        SELECT id FROM conversations
+                        WHERE id NOT IN (SELECT id FROM conversations ORDER BY timestamp DESC, id DESC LIMIT ?)
+                    """, (max_total_messages,))
+        return deleted
+
+    def compress_existing(self) -> int:
+        """
+        按 MemorySystem 的压缩阈值压缩已存储的未压缩内容，新写入的消息在存储时已压缩；
+        全文索引为无内容表，不保存原文，压缩后库中不再有未压缩的副本。
+        原地更新变小的行只会在页内留下空隙，不产生空闲页，需要之后执行 vacuum(full=True) 才能缩小文件
+        :return: 压缩的行数
+        """
+        threshold = self.memory.compress_threshold
+        if not threshold:
+            return 0
+
+        compressed = 0
+        last_id = 0
+        while True:
+            with self.memory._connection() as conn:
+                rows = conn.execute("""
+                    SELECT id, content, metadata FROM conversations
+                    WHERE id > ? AND (
+                        (typeof(content) = 'text' AND length(CAST(content AS BLOB)) >= ?) OR
+                        (typeof(metadata) = 'text' AND length(CAST(metadata AS BLOB)) >= ?)
+                    )
+                    ORDER BY id
+                    LIMIT ?
+                """, (last_id, threshold, threshold, self.batch_size)).fetchall()
+                if not rows:
+                    return compressed
+
+                with conn:
+                    conn.executemany(
+                        "UPDATE conversations SET content = ?, metadata = ? WHERE id = ?",
+                        [(self.memory.encode(self.memory.decode(content)),
+                          self.memory.encode(self.memory.decode(metadata)),
+                          row_id)
+                         for row_id, content, metadata in rows]
+                    )
+            compressed += len(rows)
+            last_id = rows[-1][0]
+
+    def archive_sessions(self, idle_days: Optional[float] = None, archive_dir: Optional[str] = None) -> Dict[str, int]:
+        """
+        把长时间没有新消息的会话移动到归档文件，按会话最后活跃的月份分文件
+        归档文件的表结构与主库一致，可以直接用 MemorySystem 打开读取
+        :param idle_days: 超过该天数没有新消息的会话视为冷会话
+        :param archive_dir: 归档文件目录
+        :return: 每个归档文件写入的行数
+        """
+        idle_days = idle_days or Config.memory_archive_idle_days
+        archive_dir = archive_dir or Config.memory_archive_dir
+        if not idle_days:
+            return {}
+
+        cutoff = (datetime.now() - timedelta(days=idle_days)).isoformat()
+        with self.memory._connection() as conn:
+            sessions = conn.execute("""
+                SELECT session_id, MAX(timestamp) AS last FROM conversations
+                GROUP BY session_id
+                HAVING last < ?
+            """, (cutoff,)).fetchall()
+
+        months: Dict[str, List[str]] = defaultdict(list)
+        for session_id, last in sessions:
+            months[last[:7]].append(session_id)
+
+        os.makedirs(archive_dir, exist_ok=True)
+        archived = {}
+        for month, session_ids in months.items():
+            path = os.path.join(archive_dir, f"conversations_{month}.db")
+            archive = MemorySystem(path, thread_local=False, wal=False,
+                                   compress_threshold=self.memory.compress_threshold, codec=self.memory.codec)
+            count = 0
+            for i in range(0, len(session_ids), self.batch_size):
+                count += self._moveSessions(archive, session_ids[i:i + self.batch_size])
+            archived[path] = count
+        return archived
+
+    def _moveSessions(self, archive: MemorySystem, session_ids: List[str]) -> int:
+        """
+        先写入归档文件再从主库删除；中途失败时重新归档会按 id 跳过已写入的行。
+        只删除已复制到归档文件的 id，复制期间写入这些会话的新消息保留在主库中
+        :return: 移动的行数
+        """
+        placeholders = ", ".join("?" for _ in session_ids)
+        with self.memory._connection() as conn:
+            rows = conn.execute(f"""
+                SELECT id, session_id, role, content, timestamp, metadata, tokens, ts
+                FROM conversations
+                WHERE session_id IN ({placeholders})
+            """, session_ids).fetchall()
+
+            with archive._connection() as archive_conn:
+                with archive_conn:
+                    inserted = []
+                    for row in rows:
+                        cursor = archive_conn.execute("""
+                            INSERT OR IGNORE INTO conversations
+                            (id, session_id, role, content, timestamp, metadata, tokens, ts)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                        """, row)
+                        if cursor.rowcount:
+                            inserted.append(row)
+                    if archive.fts:
+                        archive_conn.executemany(
+                            "INSERT INTO conversations_fts (rowid, content) VALUES (?, ?)",
+                            [(row[0], MemorySystem.decode(row[3])) for row in inserted]
+                        )
+
+            # id 列表作为一个 JSON 参数传入，不受 sqlite 参数个数的限制
+            with conn:
+                self._delete(conn, "SELECT value FROM json_each(?)", (json.dumps([row[0] for row in rows]),))
+        return len(rows)
+
+    def vacuum(self, pages: Optional[int] = None, full: bool = False) -> int:
+        """
+        增量 vacuum，把空闲页归还给文件系统；
+        未开启 auto_vacuum=INCREMENTAL 的旧数据库第一次执行时做一次完整 VACUUM 进行转换
+        :param pages: 本次最多释放的页数
+        :param full: 完整 VACUUM，重新排列页内数据，压缩已有内容之后使用
+        :return: 释放的页数，完整 VACUUM 时为文件减少的页数
+        """
+        pages = pages or Config.memory_vacuum_pages
+        with self.memory._connection() as conn:
+            if full or conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                before = conn.execute("PRAGMA page_count").fetchone()[0]
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+                after = conn.execute("PRAGMA page_count").fetchone()[0]
+            else:
+                before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+                after = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if self.memory.wal:
+                # 截断 WAL 文件，否则释放的空间仍留在 -wal 中
+                conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return before - after
+
+    def run(self) -> dict:
+        """
+        按 Config 执行全部维护：保留策略、归档、压缩、vacuum
+        :return: 各步骤的统计
+        """
+        deleted = self.apply_retention()
+        archived = self.archive_sessions()
+        compressed = self.compress_existing()
+        return {
+            "deleted": deleted,
+            "archived": archived,
+            "compressed": compressed,
+            "vacuum_pages": self.vacuum(full=bool(compressed)),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="对话历史存储维护")
+    parser.add_argument("--db", default="agent_memory.db", help="对话历史数据库路径")
+    parser.add_argument("--max-session-messages", type=int, default=None, help="每个会话保留的消息条数")
+    parser.add_argument("--max-age-days", type=float, default=None, help="消息保留天数")
+    parser.add_argument("--max-total-messages", type=int, default=None, help="全库保留的消息条数")
+    parser.add_argument("--compress-threshold", type=int, default=None, help="超过该字节数的内容压缩存储")
+    parser.add_argument("--codec", default=None, choices=["zlib", "zstd"], help="压缩算法")
+    parser.add_argument("--archive-idle-days", type=float, default=None, help="冷会话的空闲天数")
+    parser.add_argument("--archive-dir", default=None, help="归档文件目录")
+    args = parser.parse_args()
+
+    for name in ("max_session_messages", "max_age_days", "max_total_messages", "archive_idle_days", "archive_dir"):
+        if getattr(args, name) is not None:
+            setattr(Config, f"memory_{name}", getattr(args, name))
+
+    memory = MemorySystem(args.db, compress_threshold=args.compress_threshold, codec=args.codec)
+    try:
+        print(json.dumps(MemoryMaintenance(memory).run(), ensure_ascii=False, indent=2))
+    finally:
+        memory.close()
+
+
+if __name__ == "__main__":
+    main()
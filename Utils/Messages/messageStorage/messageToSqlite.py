@@ -3,77 +3,401 @@
 """
 import sqlite3
 import json
-from Utils.Messages.messageStruct.userInput import Message
-from typing import List
+import re
+import threading
+import zlib
+from contextlib import contextmanager
+from Utils.config import Config
+from Utils.Messages.messageStruct.userInput import Message, CompactMessage, to_epoch_ms
+from Utils.Messages.tokenCounter import estimate_tokens
+from typing import List, Tuple, Optional, Union, Iterator
 from datetime import datetime
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
 
 class MemorySystem:
     """记忆系统 - 存储对话历史和上下文"""
 
-    def __init__(self, db_path: str = "agent_memory.db"):
+    # 在原始表结构上新增的列，已有数据库初始化时自动补齐
+    _extra_columns = {
+        "tokens": "INTEGER",
+        # 毫秒时间戳，批量读取时不再解析 timestamp 文本
+        "ts": "INTEGER",
+    }
+
+    # 全文检索的分词：连续的字母数字或连续的中日韩字符
+    _term_pattern = re.compile(r"[0-9A-Za-z_]+|[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af]+")
+
+    # 压缩内容的首字节，标记压缩算法；未压缩的内容以 TEXT 存储，压缩后以 BLOB 存储
+    _codec_tags = {"zlib": b"z", "zstd": b"s"}
+
+    def __init__(self, db_path: str = "agent_memory.db", thread_local: bool = True, wal: bool = True,
+                 compress_threshold: Optional[int] = None, codec: str = None):
+        """
+        :param db_path: 数据库文件路径
+        :param thread_local: 是否每个线程复用同一个连接，为 False 时每次操作新建连接
+        :param wal: 是否开启 WAL 日志模式，读写互不阻塞
+        :param compress_threshold: content 与 metadata 超过该字节数时压缩存储，默认使用 Config.memory_compress_threshold
+        :param codec: 压缩算法 zlib/zstd，默认使用 Config.memory_compress_codec，未安装 zstandard 时使用 zlib
+        """
         self.db_path = db_path
+        self.thread_local = thread_local
+        self.wal = wal
+        self.compress_threshold = Config.memory_compress_threshold if compress_threshold is None else compress_threshold
+        self.codec = codec or Config.memory_compress_codec
+        if self.codec not in self._codec_tags:
+            raise ValueError(f"不支持的压缩算法 {self.codec}")
+        if self.codec == "zstd" and zstandard is None:
+            print("未安装 zstandard，使用 zlib 压缩")
+            self.codec = "zlib"
+        # sqlite 未编译 FTS5 时退化为 LIKE 检索
+        self.fts = True
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
         self.init_database()
 
+    def _connect(self) -> sqlite3.Connection:
+        """新建数据库连接"""
+        conn = sqlite3.connect(self.db_path)
+        if self.wal:
+            conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self):
+        """获取数据库连接，线程复用模式下连接在操作结束后保留"""
+        if not self.thread_local:
+            conn = self._connect()
+            try:
+                yield conn
+            finally:
+                conn.close()
+            return
+
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._local.conn = conn
+            with self._lock:
+                self._connections.append(conn)
+        yield conn
+
+    def close(self):
+        """关闭所有线程复用的连接"""
+        with self._lock:
+            for conn in self._connections:
+                try:
+                    conn.close()
+                except sqlite3.ProgrammingError:
+                    # 连接属于其他线程，随线程结束释放
+                    pass
+            self._connections.clear()
+        self._local = threading.local()
+
     def init_database(self):
         """初始化SQLite数据库"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute(
-            """
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                session_id TEXT,
-                role TEXT,
-                content TEXT,
-                timestamp TEXT,
-                metadata TEXT
-            )"""
-        )
-        conn.commit()
-        conn.close()
+        with self._connection() as conn:
+            # 只对新建的数据库生效，已有数据库由 MemoryMaintenance.vacuum 转换
+            conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            if self.wal:
+                conn.execute("PRAGMA journal_mode=WAL")
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    session_id TEXT,
+                    role TEXT,
+                    content TEXT,
+                    timestamp TEXT,
+                    metadata TEXT
+                )"""
+            )
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(conversations)")}
+            for name, column_type in self._extra_columns.items():
+                if name not in columns:
+                    cursor.execute(f"ALTER TABLE conversations ADD COLUMN {name} {column_type}")
+            if "ts" not in columns:
+                # 旧数据按 timestamp 文本补齐毫秒时间戳
+                cursor.execute("""
+                    UPDATE conversations
+                    SET ts = CAST(ROUND((julianday(timestamp) - 2440587.5) * 86400000) AS INTEGER)
+                    WHERE ts IS NULL
+                """)
+            cursor.execute(
+                """
+                CREATE INDEX IF NOT EXISTS idx_conversations_session_time
+                ON conversations (session_id, timestamp)"""
+            )
+            self._initFts(cursor)
+            conn.commit()
 
-    def store_message(self, session_id: str, message: Message):
-        """存储消息"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO conversations (session_id, role, content, timestamp, metadata)
-            VALUES (?, ?, ?, ?, ?)
-        """, (
+    def _initFts(self, cursor: sqlite3.Cursor):
+        """
+        初始化 conversations.content 的 FTS5 全文索引，rowid 与 conversations.id 一致；
+        trigram 分词不依赖空格，中文同样可以检索。
+        索引为无内容表(content='')，只保存倒排索引，原文仍只存在 conversations 中(可压缩)，
+        查询时按 rowid 关联 conversations 取回。已有数据库首次建立索引时补齐历史消息，
+        旧版本保存了原文副本的索引会重建为无内容表
+        """
+        row = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'conversations_fts'"
+        ).fetchone()
+        if row and "content=''" in row[0].replace(" ", ""):
+            return
+        try:
+            if row:
+                cursor.execute("DROP TABLE conversations_fts")
+            cursor.execute(
+                "CREATE VIRTUAL TABLE conversations_fts USING fts5(content, content = '', tokenize = 'trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            print(f"全文索引不可用，使用 LIKE 检索：{e}")
+            self.fts = False
+            return
+
+        # 历史内容可能已压缩，解压后写入索引
+        rows = cursor.connection.execute("SELECT id, content FROM conversations")
+        while True:
+            batch = rows.fetchmany(1000)
+            if not batch:
+                break
+            cursor.executemany(
+                "INSERT INTO conversations_fts (rowid, content) VALUES (?, ?)",
+                [(row_id, self.decode(content)) for row_id, content in batch]
+            )
+
+    def delete_fts(self, conn: sqlite3.Connection, id_query: str, params: tuple = ()):
+        """
+        从全文索引中删除 id_query 选出的消息，需在删除 conversations 中的行之前调用；
+        无内容表删除时需要提供原文，原文从 conversations 中读取并解压
+        :param conn: 当前事务所在的连接
+        :param id_query: 返回 conversations.id 的查询语句
+        """
+        if not self.fts:
+            return
+        rows = conn.execute(f"SELECT id, content FROM conversations WHERE id IN ({id_query})", params)
+        while True:
+            batch = rows.fetchmany(1000)
+            if not batch:
+                break
+            conn.executemany(
+                "INSERT INTO conversations_fts (conversations_fts, rowid, content) VALUES ('delete', ?, ?)",
+                [(row_id, self.decode(content)) for row_id, content in batch]
+            )
+
+    def encode(self, text: Optional[str]) -> Union[str, bytes, None]:
+        """
+        超过压缩阈值的文本压缩为 BLOB
+        :param text: 原始文本
+        :return: 原始文本，或以算法标记开头的压缩内容
+        """
+        if text is None or not self.compress_threshold:
+            return text
+        data = text.encode("utf-8")
+        if len(data) < self.compress_threshold:
+            return text
+        if self.codec == "zstd":
+            return self._codec_tags["zstd"] + zstandard.ZstdCompressor().compress(data)
+        return self._codec_tags["zlib"] + zlib.compress(data)
+
+    @classmethod
+    def decode(cls, value: Union[str, bytes, None]) -> Optional[str]:
+        """
+        读取时解压，TEXT 原样返回
+        :param value: 数据库中的值
+        :return: 原始文本
+        """
+        if not isinstance(value, bytes):
+            return value
+        tag, data = value[:1], value[1:]
+        if tag == cls._codec_tags["zstd"]:
+            if zstandard is None:
+                raise RuntimeError("解压 zstd 内容需要安装 zstandard")
+            return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+        return zlib.decompress(data).decode("utf-8")
+
+    def _toRow(self, session_id: str, message: Message) -> tuple:
+        """消息转换为数据库行"""
+        return (
             session_id,
             message.role,
-            message.content,
+            self.encode(message.content),
             message.timestamp.isoformat(),
-            json.dumps(message.metadata) if message.metadata else None
-        ))
-        conn.commit()
-        conn.close()
+            self.encode(json.dumps(message.metadata)) if message.metadata else None,
+            estimate_tokens(message.content),
+            to_epoch_ms(message.timestamp)
+        )
+
+    def _toMessage(self, role: str, content, timestamp: str, metadata) -> Message:
+        """数据库行转换为消息"""
+        metadata = self.decode(metadata)
+        return Message(
+            role=role,
+            content=self.decode(content),
+            timestamp=datetime.fromisoformat(timestamp),
+            metadata=json.loads(metadata) if metadata else None
+        )
+
+    def store_message(self, session_id: str, message: Message):
+        """存储消息"""
+        self.store_messages(session_id, [message])
+
+    def store_messages(self, session_id: str, messages: List[Message]):
+        """在一个事务中批量存储消息，如一轮对话中的工具调用与全部结果"""
+        if not messages:
+            return
+        with self._connection() as conn:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO conversations (session_id, role, content, timestamp, metadata, tokens, ts)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, [self._toRow(session_id, message) for message in messages])
+                if self.fts:
+                    # 同一事务内 AUTOINCREMENT 的 id 连续，据此同步全文索引
+                    last_id = conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                    first_id = last_id - len(messages) + 1
+                    conn.executemany(
+                        "INSERT INTO conversations_fts (rowid, content) VALUES (?, ?)",
+                        [(first_id + i, message.content) for i, message in enumerate(messages)]
+                    )
 
     def get_recent_context(self, session_id: str, limit: int = 10) -> List[Message]:
         """获取最近的对话上下文"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT role, content, timestamp, metadata 
-            FROM conversations 
-            WHERE session_id = ? 
-            ORDER BY timestamp DESC 
-            LIMIT ?
-        """, (session_id, limit))
-
-        rows = cursor.fetchall()
-        conn.close()
+        with self._connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT role, content, timestamp, metadata 
+                FROM conversations 
+                WHERE session_id = ? 
+                ORDER BY timestamp DESC 
+                LIMIT ?
+            """, (session_id, limit))
+
+            rows = cursor.fetchall()
 
         messages = []
         for row in reversed(rows):  # 按时间顺序排列
-            role, content, timestamp, metadata = row
-            msg = Message(
-                role=role,
-                content=content,
-                timestamp=datetime.fromisoformat(timestamp),
-                metadata=json.loads(metadata) if metadata else None
-            )
-            messages.append(msg)
+            messages.append(self._toMessage(*row))
+
+        return messages
+
+    def get_recent_with_tokens(self, session_id: str, limit: int = 50) -> List[Tuple[CompactMessage, int]]:
+        """
+        按时间从新到旧获取消息及其 token 数，token 数在存储时已计算，旧数据缺失时即时估算
+        """
+        with self._connection() as conn:
+            rows = conn.execute("""
+                SELECT role, content, ts, metadata, tokens
+                FROM conversations
+                WHERE session_id = ?
+                ORDER BY timestamp DESC
+                LIMIT ?
+            """, (session_id, limit)).fetchall()
+
+        decode = self.decode
+        result = []
+        for role, content, ts, metadata, tokens in rows:
+            content = decode(content)
+            result.append((CompactMessage(role, content, ts, metadata),
+                           tokens if tokens is not None else estimate_tokens(content)))
+        return result
+
+    def iter_messages(self, session_id: str = None, batch_size: int = 1000) -> Iterator[CompactMessage]:
+        """
+        按写入顺序批量读取消息，用于离线分析等需要遍历大量消息的场景
+        每批用 fetchmany 读取，时间保留为整数、metadata 不解析，相同角色共用同一个字符串对象
+        :param session_id: 用户对话唯一标识，为 None 时遍历全部会话
+        :param batch_size: 每批读取的行数
+        :return: CompactMessage 迭代器
+        """
+        sql = "SELECT role, content, ts, metadata FROM conversations"
+        params = ()
+        if session_id is not None:
+            sql += " WHERE session_id = ?"
+            params = (session_id,)
+
+        decode = self.decode
+        roles = {}
+        with self._connection() as conn:
+            cursor = conn.execute(sql + " ORDER BY id", params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    for role, content, ts, metadata in rows:
+                        if content.__class__ is bytes:
+                            content = decode(content)
+                        yield CompactMessage(roles.setdefault(role, role), content, ts, metadata)
+            finally:
+                cursor.close()
+
+    @classmethod
+    def _matchQuery(cls, query: str) -> Tuple[str, List[str]]:
+        """
+        把用户输入转换为 FTS5 查询：每个词拆成 3 字符片段后取并集，按 bm25 排序
+        :param query: 用户输入
+        :return: FTS5 查询语句，以及不足 3 个字符、只能用 LIKE 检索的短词
+        """
+        grams, short = [], []
+        for term in cls._term_pattern.findall(query.lower()):
+            if len(term) < 3:
+                short.append(term)
+                continue
+            if term.isascii():
+                grams.append(term)
+            else:
+                grams.extend(term[i:i + 3] for i in range(len(term) - 2))
+
+        match = " OR ".join('"' + gram.replace('"', '""') + '"' for gram in dict.fromkeys(grams))
+        return match, short
+
+    def search_context(self, session_id: str, query: str, k: int = 5, exclude_recent: int = 0) -> List[Message]:
+        """
+        检索会话中与 query 最相关的历史消息
+        :param session_id: 用户对话唯一标识
+        :param query: 检索内容，通常是本次用户输入
+        :param k: 返回的消息条数
+        :param exclude_recent: 排除最近的若干条消息，这部分已经放入对话历史
+        :return: 按时间顺序排列的消息
+        """
+        match, short = self._matchQuery(query)
+        if not (match or short):
+            return []
+
+        recent = """
+            SELECT id FROM conversations WHERE session_id = ? ORDER BY timestamp DESC LIMIT ?
+        """
+        with self._connection() as conn:
+            if self.fts and match:
+                rows = conn.execute(f"""
+                    SELECT c.role, c.content, c.timestamp, c.metadata
+                    FROM conversations_fts f
+                    JOIN conversations c ON c.id = f.rowid
+                    WHERE conversations_fts MATCH ? AND c.session_id = ? AND c.id NOT IN ({recent})
+                    ORDER BY bm25(conversations_fts)
+                    LIMIT ?
+                """, (match, session_id, session_id, exclude_recent, k)).fetchall()
+            else:
+                # 没有全文索引或只有短词时，按命中的词数排序；压缩存储的消息不参与匹配
+                terms = short if self.fts else self._term_pattern.findall(query.lower())
+                score = " + ".join("(instr(lower(content), ?) > 0)" for _ in terms)
+                rows = conn.execute(f"""
+                    SELECT role, content, timestamp, metadata FROM (
+                        SELECT role, content, timestamp, metadata, {score} AS score
+                        FROM conversations
+                        WHERE session_id = ? AND typeof(content) = 'text' AND id NOT IN ({recent})
+                    )
+                    WHERE score > 0
+                    ORDER BY score DESC, timestamp DESC
+                    LIMIT ?
+                """, (*terms, session_id, session_id, exclude_recent, k)).fetchall()
 
-        return messages
\ No newline at end of file
+        messages = [self._toMessage(*row) for row in rows]
+        return sorted(messages, key=lambda msg: msg.timestamp)
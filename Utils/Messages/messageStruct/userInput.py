@@ -2,9 +2,10 @@
 定义数据通用格式
 """
 
+import json
 from dataclasses import dataclass
-from datetime import datetime
-from typing import List, Dict
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Union
 
 
 @dataclass
@@ -17,4 +18,71 @@ class Message:
 
     def __post_init__(self):
         if self.timestamp is None:
-            self.timestamp = datetime.now()
\ No newline at end of file
+            self.timestamp = datetime.now()
+
+_EPOCH = datetime(1970, 1, 1)
+_UNSET = object()
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    """
+    时间转换为毫秒时间戳；不带时区的时间按其字面值计算，不做本地时区换算，
+    与 sqlite 的 julianday 结果一致
+    """
+    if timestamp.tzinfo is not None:
+        return int(timestamp.timestamp() * 1000)
+    return (timestamp - _EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(ts: int) -> datetime:
+    """毫秒时间戳转换为不带时区的时间，与 to_epoch_ms 互逆"""
+    return _EPOCH + timedelta(milliseconds=ts)
+
+
+class CompactMessage:
+    """
+    紧凑的消息结构，用于批量读取大量历史消息
+    时间以毫秒时间戳保存，访问 timestamp 时才转换为 datetime；metadata 保留原始 JSON，第一次访问时才解析
+    """
+    __slots__ = ("role", "content", "ts", "_raw_metadata", "_metadata")
+
+    def __init__(self, role: str, content: str, ts: int, raw_metadata: Union[str, bytes, None] = None):
+        """
+        :param role: 角色
+        :param content: 消息内容
+        :param ts: 毫秒时间戳
+        :param raw_metadata: 未解析的 metadata，可以是 JSON 文本或压缩后的 BLOB
+        """
+        self.role = role
+        self.content = content
+        self.ts = ts
+        self._raw_metadata = raw_metadata
+        self._metadata = _UNSET
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_epoch_ms(self.ts)
+
+    @property
+    def metadata(self) -> Optional[Dict]:
+        if self._metadata is _UNSET:
+            raw = self._raw_metadata
+            if isinstance(raw, bytes):
+                # 压缩存储的 metadata，延迟导入避免循环依赖
+                from Utils.Messages.messageStorage.messageToSqlite import MemorySystem
+                raw = MemorySystem.decode(raw)
+            self._metadata = json.loads(raw) if raw else None
+            self._raw_metadata = None
+        return self._metadata
+
+    @classmethod
+    def fromMessage(cls, message: Message) -> "CompactMessage":
+        compact = cls(message.role, message.content, to_epoch_ms(message.timestamp))
+        compact._metadata = message.metadata
+        return compact
+
+    def toMessage(self) -> Message:
+        return Message(role=self.role, content=self.content, timestamp=self.timestamp, metadata=self.metadata)
+
+    def __repr__(self):
+        return f"CompactMessage(role={self.role!r}, content={self.content!r}, ts={self.ts})"
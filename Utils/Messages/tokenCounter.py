@@ -0,0 +1,21 @@
+"""
+文本 token 数估算，不依赖具体模型的分词器
+"""
+import math
+import re
+
+
+# 中日韩字符大致每个字符一个 token
+_cjk = re.compile(r"[　-〿぀-ヿ㐀-䶿一-鿿豈-﫿＀-￯]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    估算文本的 token 数：中日韩字符按 1 个计算，其余字符按 4 个字符 1 个 token 计算
+    :param text: 文本
+    :return:
+    """
+    if not text:
+        return 0
+    cjk = len(_cjk.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
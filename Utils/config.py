@@ -1,3 +1,5 @@
+from Utils.toolIndex import ToolIndex
+
 
 class Config:
     # 注册函数的信息
@@ -6,6 +8,45 @@ class Config:
     # 注册函数本身
     register_funObject = {}
 
+    # 注册函数的 JSON 工具描述，原生函数调用模式通过模型的 tools 参数传入
+    register_funSchema = {}
+
+    # 注册函数信息的检索索引，函数注册时增量更新
+    tool_index = ToolIndex()
+
+    # 每次提问放入提示词的最相关函数个数，为 None 时放入全部函数
+    tool_top_k = None
+
+    # 是否使用模型的原生函数调用(tools 参数)，开启后不再发送 default_prompt 与 few_shot
+    native_tools = False
+
+    # 对话历史的 token 预算
+    context_max_tokens = 2000
+
+    # 对话历史中单条消息的 token 上限，超出时截断
+    context_max_message_tokens = 500
+
+    # 从更早的对话中按相关度召回的消息条数，为 0 时只使用最近的对话
+    context_recall_k = 0
+
+    # 对话历史中 content/metadata 超过该字节数时压缩存储，为 None 时不压缩
+    memory_compress_threshold = None
+
+    # 对话历史的压缩算法：zlib 或 zstd(需要安装 zstandard)
+    memory_compress_codec = "zlib"
+
+    # 对话历史保留策略，为 None 时不限制：每个会话保留的消息条数、消息保留天数、全库保留的消息条数
+    memory_max_session_messages = None
+    memory_max_age_days = None
+    memory_max_total_messages = None
+
+    # 超过该天数没有新消息的会话归档到 memory_archive_dir 下的按月分文件，为 None 时不归档
+    memory_archive_idle_days = None
+    memory_archive_dir = "memory_archive"
+
+    # 每次增量 vacuum 释放的最大页数
+    memory_vacuum_pages = 1000
+
     #函数已经调用，并在询问过程中得到结果的函数，就不要放到<functools></functools>标签中。
     # 默认提示词
     default_prompt = """
@@ -13,6 +54,7 @@ class Config:
     将调用的函数名和参数放入<functools>[{"func":"函数名1","params":{"参数名1":"参数值1",...,"参数名n":"参数值n"}},...,{"func":"函数名n","params":{"参数名1":"参数值1",...,"参数名n":"参数值n"}}]</functools>标签中，然后根据所有的函数调用结果回答问题。
     如果当前问题不需要调用函数，就回复问题，并返回<functools></functools>。
     注意：<functools></functools>中只包含还没有得到函数结果的函数。
+    相互独立的函数调用请一次全部列出，它们会被同时执行；如果某个函数的参数需要使用其他函数的结果，参数值写为 "函数名的结果"，等结果返回后再填写真实值。
     """
 
     # 用例
@@ -29,3 +71,8 @@ class Config:
     模型回复：秋天的枫叶，是季节更替里最张扬的一抹红。霜降一过，叶绿素悄然退场，原本遮蔽的花青素与类胡萝卜素开始显色——猩红、洋红、杏黄、赭石层层晕染，像有人把调色盘打翻在山林里。阳光一照，叶片近乎透明，叶脉呈淡金色骨架，仿佛一簇簇凝固的火焰。<functools></functools>
     """
 
+    # 原生函数调用模式下的提示词，函数信息通过 tools 参数传入
+    native_prompt = """
+    你是一个智能助手，需要时调用提供的工具获取信息，相互独立的工具可以一次同时调用。
+    已执行的函数结果会附在用户输入之后，函数结果足够回答时直接回答用户问题，不再调用工具。
+    """
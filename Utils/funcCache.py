@@ -0,0 +1,51 @@
+"""
+工具函数结果缓存，按函数绑定后的参数生成缓存键
+"""
+from functools import wraps
+from Utils.lruCache import LRUCache
+import inspect
+import json
+
+
+_missing = object()
+
+
+def cache_func(func, ttl: float = 60, maxsize: int = 128):
+    """
+    为函数增加带过期时间的结果缓存，只应用于只读函数
+    :param func: 被缓存的函数，支持 async def 函数
+    :param ttl: 缓存过期时间(秒)
+    :param maxsize: 最大缓存条数
+    :return: 包装后的函数，通过 cache_stats() 查看命中统计，cache_clear() 清空缓存
+    """
+    sig = inspect.signature(func)
+    cache = LRUCache(maxsize, ttl)
+
+    def make_key(args, kwargs) -> str:
+        # 绑定参数并补全默认值，getweather("北京") 与 getweather(locate="北京") 使用同一个键
+        bound = sig.bind(*args, **kwargs)
+        bound.apply_defaults()
+        return json.dumps(bound.arguments, sort_keys=True, ensure_ascii=False, default=repr)
+
+    if inspect.iscoroutinefunction(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            result = cache.get(key, _missing)
+            if result is _missing:
+                result = await func(*args, **kwargs)
+                cache.set(key, result)
+            return result
+    else:
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = make_key(args, kwargs)
+            result = cache.get(key, _missing)
+            if result is _missing:
+                result = func(*args, **kwargs)
+                cache.set(key, result)
+            return result
+
+    wrapper.cache_stats = cache.stats
+    wrapper.cache_clear = cache.clear
+    return wrapper
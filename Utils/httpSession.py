@@ -0,0 +1,29 @@
+"""
+共享的 HTTP 连接池，远程工具注册与调用复用 keep-alive 连接
+"""
+from requests.adapters import HTTPAdapter
+import requests
+import threading
+
+
+_session = None
+_lock = threading.Lock()
+
+
+def get_session(pool_connections: int = 10, pool_maxsize: int = 32) -> requests.Session:
+    """
+    获取进程内共享的 requests.Session，首次调用时创建
+    :param pool_connections: 缓存连接池的主机数量
+    :param pool_maxsize: 每个主机的最大连接数，应不小于并行调用的线程数
+    :return:
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                _session = session
+    return _session
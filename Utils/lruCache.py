@@ -0,0 +1,76 @@
+"""
+线程安全的内存 LRU 缓存，支持容量与过期时间淘汰
+"""
+from collections import OrderedDict
+from typing import Any, Optional
+import threading
+import time
+
+
+class LRUCache:
+    """LRU 缓存"""
+
+    _missing = object()
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None):
+        """
+        :param maxsize: 最大缓存条数
+        :param ttl: 过期时间(秒)，为 None 时不过期
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default: Any = None):
+        """读取缓存，不存在或已过期时返回 default"""
+        with self._lock:
+            item = self._data.get(key, self._missing)
+            if item is self._missing:
+                self.misses += 1
+                return default
+
+            value, expire_at = item
+            if expire_at is not None and expire_at < time.monotonic():
+                del self._data[key]
+                self.evictions += 1
+                self.misses += 1
+                return default
+
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        expire_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expire_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __contains__(self, key) -> bool:
+        return self.get(key, self._missing) is not self._missing
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """命中统计"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,163 @@
+"""
+进程内指标统计：计数器与直方图，支持 Prometheus 文本格式导出与回调钩子
+"""
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+import bisect
+import threading
+import time
+
+
+# 耗时直方图默认分桶(秒)
+DEFAULT_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+# 文本长度直方图默认分桶(字符)
+DEFAULT_SIZE_BUCKETS = (100, 500, 1000, 2000, 5000, 10000, 20000, 50000, 100000)
+
+
+def _labelKey(labels: dict) -> Tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _formatLabels(key: Tuple, extra: Dict[str, str] = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    body = ",".join(
+        '{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for k, v in items
+    )
+    return "{" + body + "}"
+
+
+class Counter:
+    """计数器"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str = ""):
+        self.name = name
+        self.help = help
+        self.values = {}
+
+    def observe(self, value: float, key: Tuple):
+        self.values[key] = self.values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_formatLabels(key)} {value}" for key, value in self.values.items()]
+
+
+class Histogram:
+    """直方图"""
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str = "", buckets=DEFAULT_TIME_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+
+    def observe(self, value: float, key: Tuple):
+        counts, total = self.values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.values[key] = (counts, total + value)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, (counts, total) in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_formatLabels(key, {'le': bound})} {cumulative}")
+            cumulative += counts[-1]
+            lines.append(f"{self.name}_bucket{_formatLabels(key, {'le': '+Inf'})} {cumulative}")
+            lines.append(f"{self.name}_sum{_formatLabels(key)} {total}")
+            lines.append(f"{self.name}_count{_formatLabels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    指标注册表
+    每次记录指标时都会调用通过 add_hook 注册的回调 hook(name, value, labels)，便于接入其他监控系统
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._hooks = []
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str = "") -> Counter:
+        """声明计数器"""
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help))
+
+    def histogram(self, name: str, help: str = "", buckets=DEFAULT_TIME_BUCKETS) -> Histogram:
+        """声明直方图"""
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def add_hook(self, hook: Callable):
+        """注册回调，参数为 (指标名称, 数值, 标签)"""
+        self._hooks.append(hook)
+
+    def remove_hook(self, hook: Callable):
+        """移除回调"""
+        self._hooks.remove(hook)
+
+    def _record(self, name: str, value: float, labels: dict, default):
+        metric = self._metrics.get(name) or default(name)
+        with self._lock:
+            metric.observe(value, _labelKey(labels))
+        for hook in self._hooks:
+            try:
+                hook(name, value, labels)
+            except Exception as e:
+                print(f"指标回调出现错误❌：{str(e)}")
+
+    def inc(self, name: str, value: float = 1, **labels):
+        """计数器增加"""
+        self._record(name, value, labels, self.counter)
+
+    def observe(self, name: str, value: float, **labels):
+        """直方图记录一个观测值"""
+        self._record(name, value, labels, self.histogram)
+
+    @contextmanager
+    def timer(self, name: str, **labels):
+        """统计代码块耗时(秒)，记录到直方图"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self) -> str:
+        """导出 Prometheus 文本格式"""
+        lines = []
+        with self._lock:
+            for metric in self._metrics.values():
+                if metric.help:
+                    lines.append(f"# HELP {metric.name} {metric.help}")
+                lines.append(f"# TYPE {metric.name} {metric.type}")
+                lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+metrics.histogram("agent_stage_seconds", "智能体每轮各阶段耗时(秒)，stage 为 prompt/invoke/parse/tools/storage")
+metrics.counter("agent_iterations_total", "智能体迭代轮数")
+metrics.counter("agent_parse_failures_total", "模型回复格式不规范的次数")
+metrics.counter("agent_parse_repairs_total", "在本地修复的模型回复格式错误次数")
+metrics.histogram("agent_prompt_chars", "模型输入字符数", DEFAULT_SIZE_BUCKETS)
+metrics.histogram("agent_response_chars", "模型回复字符数", DEFAULT_SIZE_BUCKETS)
+metrics.histogram("agent_tool_calls", "每轮执行的函数调用数", (1, 2, 3, 4, 5, 8, 16))
+metrics.histogram("http_request_seconds", "工具中心接口耗时(秒)")
+metrics.counter("http_requests_total", "工具中心接口请求数")
+metrics.histogram("tool_call_seconds", "工具中心函数执行耗时(秒)")
+metrics.histogram("agent_queue_seconds", "智能体服务任务排队耗时(秒)")
+metrics.counter("model_backend_requests_total", "路由模型各后端的请求数，status 为 ok/error")
+metrics.histogram("model_backend_seconds", "路由模型各后端成功请求的耗时(秒)")
+metrics.counter("model_hedged_requests_total", "路由模型发出的对冲请求数")
@@ -0,0 +1,139 @@
+"""
+函数信息的本地检索索引(BM25)，为每次提问只挑选相关的函数放入提示词
+"""
+from collections import Counter
+from typing import Dict, List
+import math
+import re
+import threading
+
+
+_ascii_word = re.compile(r"[A-Za-z0-9_]+")
+_cjk_run = re.compile(r"[㐀-䶿一-鿿豈-﫿]+")
+
+
+# 不参与检索的词：常见虚字，以及函数信息模板中每个函数都有的词(参数为、类型为、默认值为 None 等)
+_stop_chars = set("的了是否在为与及并请你我他她它们这那个吗呢吧啊么也就都而或")
+_stop_words = {"函数", "作用", "参数", "类型", "必须", "默认", "认值", "none", "class", "any"}
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    分词：英文与数字按单词切分并转小写，中文按单字与相邻两字切分；忽略单个字母或数字与停用词
+    :param text: 文本
+    :return:
+    """
+    if not text:
+        return []
+    tokens = [w for w in (w.lower() for w in _ascii_word.findall(text)) if len(w) > 1]
+    for run in _cjk_run.findall(text):
+        tokens.extend(ch for ch in run if ch not in _stop_chars)
+        tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return [token for token in tokens if token not in _stop_words]
+
+
+class ToolIndex:
+    """
+    BM25 倒排索引
+    函数注册时增量加入，修改或删除时只更新对应函数的条目
+    """
+
+    # 补足模式下，得分低于最高分该比例的命中视为不相关
+    min_ratio = 0.3
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = {}
+        self._postings = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def fromDocs(cls, func_docs: Dict[str, str]) -> "ToolIndex":
+        """根据 {函数名: 函数信息} 构建索引"""
+        index = cls()
+        index.sync(func_docs)
+        return index
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def _remove(self, func_name: str):
+        doc = self._docs.pop(func_name, None)
+        if doc is None:
+            return
+        _, freqs, length = doc
+        self._total_length -= length
+        for term in freqs:
+            posting = self._postings[term]
+            posting.pop(func_name, None)
+            if not posting:
+                del self._postings[term]
+
+    def add(self, func_name: str, func_info: str):
+        """
+        加入或更新一个函数，函数信息未变化时跳过
+        :param func_name: 函数名称
+        :param func_info: 函数信息
+        """
+        with self._lock:
+            doc = self._docs.get(func_name)
+            if doc is not None and doc[0] == func_info:
+                return
+            self._remove(func_name)
+
+            # 函数名本身也参与检索
+            freqs = Counter(tokenize(func_info) + tokenize(func_name.replace("_", " ")))
+            length = sum(freqs.values())
+            self._docs[func_name] = (func_info, freqs, length)
+            self._total_length += length
+            for term, tf in freqs.items():
+                self._postings.setdefault(term, {})[func_name] = tf
+
+    def remove(self, func_name: str):
+        """删除一个函数"""
+        with self._lock:
+            self._remove(func_name)
+
+    def sync(self, func_docs: Dict[str, str]):
+        """
+        与 {函数名: 函数信息} 同步，只处理新增、修改与删除的函数
+        """
+        for func_name, func_info in func_docs.items():
+            self.add(func_name, func_info)
+        for func_name in set(self._docs) - set(func_docs):
+            self.remove(func_name)
+
+    def search(self, query: str, k: int = 5, fill: bool = False) -> List[str]:
+        """
+        检索与问题最相关的函数
+        :param query: 用户输入
+        :param k: 返回的函数个数
+        :param fill: 是否去掉相关度过低的命中，并在不足 k 个时按注册顺序用其余函数补足
+        :return: 按相关度从高到低排列的函数名称
+        """
+        with self._lock:
+            n = len(self._docs)
+            if n == 0:
+                return []
+            avg_length = self._total_length / n
+
+            scores = {}
+            for term in set(tokenize(query)):
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+                for func_name, tf in posting.items():
+                    length = self._docs[func_name][2]
+                    norm = tf * (self.k1 + 1) / (tf + self.k1 * (1 - self.b + self.b * length / avg_length))
+                    scores[func_name] = scores.get(func_name, 0.0) + idf * norm
+
+            names = sorted(scores, key=scores.get, reverse=True)[:k]
+            if fill:
+                # 只靠个别常见字命中的函数相关度很低，让位给其余函数
+                names = [name for name in names if scores[name] >= scores[names[0]] * self.min_ratio]
+                if len(names) < k:
+                    names += [name for name in self._docs if name not in names][:k - len(names)]
+        return names